@@ -25,9 +25,11 @@ Usage:
 import os
 import sys
 import argparse
+import re
 import yaml
 import logging
 import subprocess
+from collections import deque
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -74,6 +76,14 @@ class BatchProcessor:
     - B2 storage integration
     """
 
+    # Single pass over each new log chunk: success marker, pipeline failure, error lines, URLs
+    _LOG_SCANNER = re.compile(
+        r'(VASTAI_PIPELINE_COMPLETED_SUCCESSFULLY)'
+        r'|(ERROR: Pipeline failed with exit code)'
+        r'|(ERROR|FAILED)'
+        r'|(https://[^\s]+)'
+    )
+
     def __init__(self, config_path: str = 'config.yaml'):
         """
         Initialize batch processor.
@@ -169,19 +179,18 @@ class BatchProcessor:
             Result URL if found, None otherwise
         """
         import time
-        import re
 
         start_time = time.time()
-        last_log_line = 0
-        success_marker = "VASTAI_PIPELINE_COMPLETED_SUCCESSFULLY"
-        url_pattern = r'https://[^\s]+'
+        last_lines = deque(maxlen=5)    # Last log lines seen; logs are fetched incrementally after them
+        line_count = 0
+        result_url = None       # Latest result URL seen in the logs
+        recent_errors = deque(maxlen=5)  # Latest error lines not yet reported
 
         logger.info(f"[MONITOR] Watching logs for instance #{instance_id}...")
 
         consecutive_failures = 0
         max_consecutive_failures = 6  # 6 failures = 1 minute of no response
         check_count = 0
-        lines = []  # Initialize to avoid undefined variable
 
         while time.time() - start_time < timeout:
             try:
@@ -190,66 +199,72 @@ class BatchProcessor:
 
                 # Progress indicator every 30 seconds
                 if check_count % 6 == 0:
-                    logger.info(f"[MONITOR] Still monitoring... ({elapsed}s elapsed, {len(lines)} log lines)")
+                    logger.info(f"[MONITOR] Still monitoring... ({elapsed}s elapsed, {line_count} log lines)")
 
-                # Get logs
-                logs = self.vast_client.get_instance_logs(instance_id, tail=500)
+                # Get logs (only the lines after the last one seen)
+                logs = self.vast_client.get_instance_logs(instance_id, tail=500, since=tuple(last_lines) or None)
 
                 if not logs:
-                    consecutive_failures += 1
-                    if consecutive_failures == 1:
-                        logger.info(f"[MONITOR] Waiting for logs to appear...")
-                    elif consecutive_failures >= max_consecutive_failures:
-                        logger.warning(f"[WARN] No logs after {consecutive_failures * 10}s, but continuing...")
-                        consecutive_failures = 0  # Reset to avoid spam
+                    if not last_lines:
+                        consecutive_failures += 1
+                        if consecutive_failures == 1:
+                            logger.info(f"[MONITOR] Waiting for logs to appear...")
+                        elif consecutive_failures >= max_consecutive_failures:
+                            logger.warning(f"[WARN] No logs after {consecutive_failures * 10}s, but continuing...")
+                            consecutive_failures = 0  # Reset to avoid spam
                     time.sleep(10)
                     continue
 
                 # Reset failure counter on success
                 consecutive_failures = 0
 
-                lines = logs.split('\n')
-
-                # Show new lines (only if there are actually new lines)
-                if len(lines) > last_log_line:
-                    new_lines = lines[last_log_line:]
-                    new_content = [line for line in new_lines if line.strip()]
-
-                    if new_content:
-                        for line in new_content:
-                            logger.info(f"  [LOG] {line}")
-                        last_log_line = len(lines)
+                # Show new lines
+                new_content = [line for line in logs.split('\n') if line and not line.isspace()]
+                if not new_content:
+                    time.sleep(10)
+                    continue
+                # One log record per chunk instead of one per line
+                logger.info('\n'.join(f"  [LOG] {line}" for line in new_content))
+                last_lines.extend(new_content[-5:])
+                line_count += len(new_content)
+
+                # Scan the new chunk once for every marker
+                completed = failed = False
+                for m in self._LOG_SCANNER.finditer(logs):
+                    if m.group(1):
+                        completed = True
+                    elif m.group(4):
+                        if self._is_result_url(m.group(4)):
+                            result_url = m.group(4)
+                    else:
+                        failed = failed or bool(m.group(2))
+                        line = self._line_at(logs, m.start())
+                        if not recent_errors or recent_errors[-1] != line:
+                            recent_errors.append(line)
 
                 # Check for success
-                if success_marker in logs:
+                if completed:
                     logger.info(f"[OK] Processing completed successfully!")
 
-                    # Extract result URL
-                    urls = re.findall(url_pattern, logs)
-                    for url in reversed(urls):  # Get last URL
-                        if 'noxfvr-videos' in url and ('output/' in url or 'both/' in url or 'upscales/' in url or 'interps/' in url):
-                            logger.info(f"[RESULT] Download URL: {url}")
-                            return url
+                    if result_url:
+                        logger.info(f"[RESULT] Download URL: {result_url}")
+                        return result_url
 
                     logger.warning("[WARN] Success marker found but no result URL")
                     return None
 
                 # Check for pipeline failure (immediate termination)
-                pipeline_failed_marker = "ERROR: Pipeline failed with exit code"
-                if pipeline_failed_marker in logs:
+                if failed:
                     logger.error(f"[ERROR] Pipeline failed - stopping monitoring")
-                    # Extract last error
-                    error_lines = [l for l in lines if 'ERROR' in l]
-                    if error_lines:
-                        logger.error(f"[ERROR] Last error: {error_lines[-1][:200]}")
+                    for line in recent_errors:
+                        logger.error(f"[ERROR] Last error: {line[:200]}")
                     return None  # Exit monitoring, instance will be destroyed
 
                 # Check for other errors (only report periodically)
                 if check_count == 1 or (check_count % 12 == 0):  # Check every 2 minutes
-                    if 'ERROR' in logs or 'FAILED' in logs:
-                        error_lines = [l for l in lines if 'ERROR' in l or 'FAILED' in l]
-                        if error_lines:
-                            logger.warning(f"[WARN] Recent errors: {error_lines[-1][:100]}")
+                    if recent_errors:
+                        logger.warning(f"[WARN] Recent errors: {recent_errors[-1][:100]}")
+                        recent_errors.clear()
 
                 time.sleep(10)
 
@@ -262,6 +277,17 @@ class BatchProcessor:
         logger.error(f"[ERROR] Monitoring timeout after {timeout}s")
         return None
 
+    @staticmethod
+    def _is_result_url(url: str) -> bool:
+        """Check whether a URL from the logs points at a processing result."""
+        return 'noxfvr-videos' in url and ('output/' in url or 'both/' in url or 'upscales/' in url or 'interps/' in url)
+
+    @staticmethod
+    def _line_at(text: str, pos: int) -> str:
+        """Return the line of `text` containing offset `pos`."""
+        end = text.find('\n', pos)
+        return text[text.rfind('\n', 0, pos) + 1:end if end >= 0 else len(text)]
+
     def _filter_existing_outputs(self, files: List) -> List:
         """Filter out files that already have output."""
         if not self.b2_client:
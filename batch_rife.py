@@ -1,4 +1,4 @@
-import sys, os, traceback
+import sys, os, traceback, contextlib
 
 # ============================================================================
 # CRITICAL: Package setup happens in a specific order to avoid import errors
@@ -44,6 +44,11 @@ def try_dotted(dotted):
     global Model
     tried_locations.append(f"dotted:{dotted}")
     try:
+        # probe the spec first: an absent module is a None result instead of a raised ImportError. A missing
+        # parent package still raises ModuleNotFoundError and goes through the package injection below.
+        if importlib.util.find_spec(dotted) is None:
+            tried_locations.append(f"dotted_no_spec:{dotted}")
+            return False
         mod = importlib.import_module(dotted)
         if hasattr(mod, 'Model'):
             Model = getattr(mod, 'Model')
@@ -327,12 +332,9 @@ for p in candidates_sys_paths:
         tried_locations.append(f"sys.path-added:{p}")
 
 # Package-style attempts (original fallback order)
-if try_dotted('train_log.RIFE_HDv3'):
-    pass
-elif try_dotted('model.RIFE'):
-    pass
-elif try_dotted('train_log.RIFE_HD'):
-    pass
+for _dotted in ('train_log.RIFE_HDv3', 'model.RIFE', 'train_log.RIFE_HD'):
+    if try_dotted(_dotted):
+        break
 
 # 2) If still not found, try file-based imports from several likely locations
 if Model is None:
@@ -360,41 +362,24 @@ if Model is None:
 
 # broaden search: look for likely model files under repo and common subdirs
 if Model is None:
-    def scan_for_candidates(base_dirs, name_hint_patterns=('rife','model')):
+    def scan_for_candidates(base_dirs):
+        # one recursive glob per base (os.scandir under the hood) instead of nested listdir passes
+        from glob import glob
         cand = []
         for base in base_dirs:
             if not base or not os.path.isdir(base):
                 continue
-            # prioritize train_log and model subdirs
-            for sub in ('train_log','model',''):
-                d = os.path.join(base, sub) if sub else base
-                if not os.path.isdir(d):
-                    continue
-                try:
-                    for fname in sorted(os.listdir(d)):
-                        lf = fname.lower()
-                        if not lf.endswith('.py'):
-                            continue
-                        # prefer files that contain hint words
-                        for pat in name_hint_patterns:
-                            if pat in lf:
-                                cand.append(os.path.join(d, fname))
-                                break
-                        else:
-                            # also keep generic python files as lower priority
-                            cand.append(os.path.join(d, fname))
-                except Exception:
-                    continue
-        # dedupe while preserving order
-        seen=set(); out=[]
-        for p in cand:
-            if p not in seen:
-                seen.add(p); out.append(p)
-        return out
+            cand.extend(glob(os.path.join(base, '**', '*.py'), recursive=True))
+        # prefer train_log files, then files whose name hints at rife/model; generic files last
+        def rank(p):
+            lf = os.path.basename(p).lower()
+            return ('train_log' not in p, 'rife' not in lf, 'model' not in lf, p)
+        # dedupe (bases overlap) while keeping ranked order
+        return list(dict.fromkeys(sorted(cand, key=rank)))
 
-    extra_bases = [repo, os.path.join(repo,'model'), os.path.join(repo,'train_log')]
+    extra_bases = [repo]
     if alt_repo and alt_repo != repo:
-        extra_bases.extend([alt_repo, os.path.join(alt_repo,'model'), os.path.join(alt_repo,'train_log')])
+        extra_bases.append(alt_repo)
     candidates = scan_for_candidates(extra_bases)
     # attempt imports on candidate files
     for p in candidates:
@@ -412,12 +397,11 @@ if Model is None:
     # Show top-level listing of repo for debugging
     try:
         print('DEBUG: repo listing (top 50):')
-        for root, dirs, files in os.walk(repo):
-            print('  dir:', root)
-            for f in files[:50]:
-                if f.endswith('.py'):
-                    print('    file:', f)
-            break
+        print('  dir:', repo)
+        with os.scandir(repo) as it:
+            for entry in sorted((e.name for e in it if e.is_file()))[:50]:
+                if entry.endswith('.py'):
+                    print('    file:', entry)
     except Exception:
         pass
     sys.exit(2)
@@ -427,11 +411,54 @@ if PROBE_MODE:
     print('RIFE model class available')
     sys.exit(0)
 
+# load CUDA kernels on first use instead of all at context creation (faster start, less host memory)
+os.environ.setdefault('CUDA_MODULE_LOADING', 'LAZY')
+# growable segments: a shape change (or the OOM batch halving) reuses the cached pool instead of fragmenting it
+os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True')
 import torch
 from torch.nn import functional as F
 import cv2
 import numpy as np
+import re
 import time
+import inspect
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Multi-GPU: one child process per visible GPU, each interpolating a contiguous slice of the pairs. Children are
+# this script re-run with CUDA_VISIBLE_DEVICES pinned and RIFE_SHARD=k/n; RIFE_GPUS=N caps the count (1 disables;
+# auto/all/empty or an unparsable value use every detected device).
+SHARD = os.environ.get('RIFE_SHARD')
+if not SHARD and torch.cuda.is_available():
+    n_gpus = torch.cuda.device_count()
+    _gpus_env = os.environ.get('RIFE_GPUS', 'auto').strip().lower()
+    if _gpus_env not in ('', 'auto', 'all'):
+        try:
+            n_gpus = max(1, min(n_gpus, int(_gpus_env)))
+        except ValueError:
+            print(f"Batch-runner: ignoring invalid RIFE_GPUS={_gpus_env!r}, using {n_gpus} GPU(s)")
+    if n_gpus > 1:
+        import signal, subprocess
+        _visible = os.environ.get('CUDA_VISIBLE_DEVICES')
+        dev_ids = [d.strip() for d in _visible.split(',')] if _visible else [str(k) for k in range(n_gpus)]
+        print(f"Batch-runner: sharding pairs across {n_gpus} GPUs ({','.join(dev_ids[:n_gpus])})")
+        sys.stdout.flush()
+        # a SIGTERM from the stall monitor must also stop the children
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(143))
+        procs = []
+        try:
+            for k in range(n_gpus):
+                env = dict(os.environ, CUDA_VISIBLE_DEVICES=dev_ids[k], RIFE_SHARD=f"{k}/{n_gpus}")
+                procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)] + sys.argv[1:], env=env))
+            rcs = [p.wait() for p in procs]
+        finally:
+            for p in procs:
+                if p.poll() is None:
+                    p.terminate()
+        print(f"Batch-runner: shard exit codes {rcs}")
+        sys.exit(next((rc for rc in rcs if rc), 0))
 
 # instantiate and load weights
 try:
@@ -460,6 +487,283 @@ except Exception:
 use_cuda = torch.cuda.is_available()
 device = torch.device('cuda' if use_cuda else 'cpu')
 
+# RIFE is conv-heavy: NHWC (channels_last) lets cuDNN pick the faster Tensor Core kernels
+# and avoids layout conversions inside every conv. Inputs are converted to match below.
+try:
+    model.flownet = model.flownet.to(memory_format=torch.channels_last)
+except Exception as _e:
+    print(f"DEBUG: channels_last conversion skipped: {_e}")
+# every pair of a directory has the same padded shape, so let cuDNN time the NHWC kernels once and cache the winner
+if use_cuda:
+    torch.backends.cudnn.benchmark = True
+    # fp32 runs (RIFE_PRECISION=fp32) still use tensor cores on Ampere+; the error is far below one uint8 step
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+# this script never trains: no autograd bookkeeping even outside infer_ctx (padding, bisection bookkeeping)
+torch.set_grad_enabled(False)
+
+# Reduced precision for the flow CNN on CUDA: halves HBM/PCIe bytes and runs on tensor cores.
+# RIFE_PRECISION=fp16 | bf16 | fp32. CPU always stays fp32. The default is fp16 on GPUs with tensor cores
+# (sm_70+) and fp32 below, where half-precision convs are no faster.
+_default_precision = 'fp32'
+if use_cuda:
+    try:
+        _default_precision = 'fp16' if torch.cuda.get_device_capability(0)[0] >= 7 else 'fp32'
+    except Exception:
+        _default_precision = 'fp16'
+_precision = os.environ.get('RIFE_PRECISION', _default_precision).lower()
+if use_cuda and _precision in ('fp16', 'half'):
+    infer_dtype = torch.float16
+elif use_cuda and _precision == 'bf16':
+    infer_dtype = torch.bfloat16
+else:
+    infer_dtype = torch.float32
+if infer_dtype != torch.float32:
+    try:
+        model.flownet = model.flownet.to(dtype=infer_dtype)
+    except Exception as _e:
+        print(f"DEBUG: {infer_dtype} conversion failed, staying fp32: {_e}")
+        infer_dtype = torch.float32
+print(f"DEBUG: inference dtype={infer_dtype}")
+
+@contextlib.contextmanager
+def infer_ctx():
+    """No autograd bookkeeping, plus autocast when running reduced precision on CUDA."""
+    with torch.inference_mode():
+        if infer_dtype == torch.float32:
+            yield
+        else:
+            with torch.autocast(device_type='cuda', dtype=infer_dtype):
+                yield
+
+# Optional graph compilation of model.inference (RIFE_COMPILE=1). The padded shape is fixed per directory,
+# so the compiled kernels (and, with 'reduce-overhead', the captured CUDA graph) are reused for every batch;
+# only a different batch size (e.g. the last, partial batch) triggers one more specialization.
+# The first call pays the compile cost, so it is opt-in.
+COMPILE = os.environ.get('RIFE_COMPILE', '0').lower() not in ('0', 'false', 'no', '')
+if COMPILE and hasattr(torch, 'compile'):
+    try:
+        import torch._dynamo
+        # fall back to eager for anything dynamo cannot handle instead of failing the whole run
+        torch._dynamo.config.suppress_errors = True
+        _compile_mode = os.environ.get('RIFE_COMPILE_MODE', 'reduce-overhead')
+        model.inference = torch.compile(model.inference, mode=_compile_mode, dynamic=False)
+        print(f"DEBUG: model.inference compiled (mode={_compile_mode})")
+    except Exception as _e:
+        print(f"DEBUG: torch.compile unavailable, running eager: {_e}")
+        COMPILE = False
+
+# Optional TensorRT path (RIFE_TRT=1, needs the `tensorrt` package as in the -trt image). The midpoint forward
+# model.inference(img0, img1) is exported to ONNX once per padded (ph,pw), built into an engine in infer_dtype
+# with a dynamic batch dimension up to RIFE_BATCH, and cached in RIFE_TRT_CACHE. Midpoint calls (factor 2, and the
+# 0.5 node of bisection) never pass a timestep, so they reach the engine on timestep models too. Calls with extra
+# arguments (timestep), and shapes whose export or build failed, run through the PyTorch model instead.
+TRT = os.environ.get('RIFE_TRT', '0').lower() not in ('0', 'false', 'no', '')
+TRT_CACHE_DIR = os.environ.get('RIFE_TRT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'rife_trt'))
+
+class _MidpointModule(torch.nn.Module):
+    """Exportable wrapper around the model's midpoint inference."""
+    def __init__(self, inference, flownet):
+        super().__init__()
+        self.flownet = flownet  # registered so the weights become ONNX initializers
+        self._inference = inference
+
+    def forward(self, img0, img1):
+        return self._inference(img0, img1)
+
+class TRTInference:
+    """Drop-in replacement for model.inference that runs the midpoint forward on TensorRT engines."""
+
+    def __init__(self, fallback, max_batch):
+        import tensorrt as trt
+        self.trt = trt
+        self.fallback = fallback
+        self.max_batch = max_batch
+        self.logger = trt.Logger(trt.Logger.WARNING)
+        self.contexts = {}  # (ph, pw) -> (engine, execution context), or None when that shape fell back
+        # keep the original signature visible (timestep detection inspects it)
+        self.__signature__ = inspect.signature(fallback)
+        weights = os.path.join(model_dir, 'flownet.pkl')
+        try:
+            st = os.stat(weights)
+            import hashlib
+            self.tag = hashlib.md5(f"{os.path.realpath(weights)}:{st.st_size}:{int(st.st_mtime)}".encode()).hexdigest()[:8]
+        except OSError:
+            self.tag = 'noweights'
+
+    def _engine_path(self, ph, pw):
+        dt = {torch.float16: 'fp16', torch.bfloat16: 'bf16'}.get(infer_dtype, 'fp32')
+        return os.path.join(TRT_CACHE_DIR, f"rife_{self.tag}_{ph}x{pw}_b{self.max_batch}_{dt}_trt{self.trt.__version__}.engine")
+
+    def _build(self, ph, pw, engine_path):
+        trt = self.trt
+        onnx_path = engine_path[:-len('.engine')] + '.onnx'
+        dummy = torch.zeros((1, 3, ph, pw), dtype=infer_dtype, device=device)
+        with torch.inference_mode():
+            torch.onnx.export(_MidpointModule(self.fallback, model.flownet), (dummy, dummy), onnx_path,
+                              input_names=['img0', 'img1'], output_names=['mid'], opset_version=17,
+                              dynamic_axes={'img0': {0: 'n'}, 'img1': {0: 'n'}, 'mid': {0: 'n'}})
+        builder = trt.Builder(self.logger)
+        flags = 0
+        if hasattr(trt.NetworkDefinitionCreationFlag, 'EXPLICIT_BATCH'):
+            flags = 1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH)
+        network = builder.create_network(flags)
+        parser = trt.OnnxParser(network, self.logger)
+        with open(onnx_path, 'rb') as fh:
+            if not parser.parse(fh.read()):
+                raise RuntimeError('ONNX parse failed: ' + '; '.join(str(parser.get_error(k)) for k in range(parser.num_errors)))
+        config = builder.create_builder_config()
+        if infer_dtype == torch.float16:
+            config.set_flag(trt.BuilderFlag.FP16)
+        elif infer_dtype == torch.bfloat16 and hasattr(trt.BuilderFlag, 'BF16'):
+            config.set_flag(trt.BuilderFlag.BF16)
+        profile = builder.create_optimization_profile()
+        for name in ('img0', 'img1'):
+            profile.set_shape(name, (1, 3, ph, pw), (self.max_batch, 3, ph, pw), (self.max_batch, 3, ph, pw))
+        config.add_optimization_profile(profile)
+        blob = builder.build_serialized_network(network, config)
+        if blob is None:
+            raise RuntimeError('TensorRT engine build failed')
+        with open(engine_path, 'wb') as fh:
+            fh.write(blob)
+        return blob
+
+    def _context(self, ph, pw):
+        key = (ph, pw)
+        if key not in self.contexts:
+            ctx = None
+            engine_path = self._engine_path(ph, pw)
+            try:
+                if os.path.isfile(engine_path):
+                    with open(engine_path, 'rb') as fh:
+                        blob = fh.read()
+                    print(f"DEBUG: TensorRT engine loaded from {engine_path}")
+                else:
+                    os.makedirs(TRT_CACHE_DIR, exist_ok=True)
+                    print(f"DEBUG: building TensorRT engine for {ph}x{pw} (one-time, cached in {TRT_CACHE_DIR})")
+                    sys.stdout.flush()
+                    blob = self._build(ph, pw, engine_path)
+                engine = self.trt.Runtime(self.logger).deserialize_cuda_engine(blob)
+                # the engine must outlive its context, so keep both
+                ctx = (engine, engine.create_execution_context())
+            except Exception as e:
+                print(f"DEBUG: TensorRT unavailable for {ph}x{pw}, using PyTorch: {e}")
+            sys.stdout.flush()
+            self.contexts[key] = ctx
+        return self.contexts[key]
+
+    def __call__(self, img0, img1, *args, **kwargs):
+        n, _, ph, pw = img0.shape
+        if args or kwargs or not img0.is_cuda or n > self.max_batch:
+            return self.fallback(img0, img1, *args, **kwargs)
+        entry = self._context(ph, pw)
+        if entry is None:
+            return self.fallback(img0, img1)
+        ctx = entry[1]
+        # the engine takes linear NCHW input in its build precision
+        img0 = img0.to(infer_dtype).contiguous()
+        img1 = img1.to(infer_dtype).contiguous()
+        ctx.set_input_shape('img0', tuple(img0.shape))
+        ctx.set_input_shape('img1', tuple(img1.shape))
+        out = torch.empty(tuple(ctx.get_tensor_shape('mid')), dtype=infer_dtype, device=img0.device)
+        ctx.set_tensor_address('img0', img0.data_ptr())
+        ctx.set_tensor_address('img1', img1.data_ptr())
+        ctx.set_tensor_address('mid', out.data_ptr())
+        if not ctx.execute_async_v3(torch.cuda.current_stream().cuda_stream):
+            raise RuntimeError('TensorRT execution failed')
+        return out
+
+if TRT and use_cuda:
+    try:
+        model.inference = TRTInference(model.inference, max(1, int(os.environ.get('RIFE_BATCH', '8'))))
+        print(f"DEBUG: TensorRT {model.inference.trt.__version__} enabled for midpoint inference")
+    except Exception as _e:
+        print(f"DEBUG: TensorRT disabled: {_e}")
+
+class CUDAGraphInference:
+    """model.inference replacement that captures the forward as a CUDA graph per input shape and replays it
+    (RIFE_CUDA_GRAPH=1). All pairs of a directory share one padded shape, so after a short warmup every call is
+    a single graph launch instead of dozens of kernel launches. Calls with a `timestep` tensor get their own graph,
+    with the timestep copied in like the images."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        # (shape, dtype, layout, timestep shape) -> (graph, static_in0, static_in1, static_timestep, static_out),
+        # or None if capture failed
+        self.graphs = {}
+        # keep the original signature visible (timestep detection inspects it)
+        self.__signature__ = inspect.signature(fallback)
+
+    def _forward(self, img0, img1, timestep):
+        if timestep is None:
+            return self.fallback(img0, img1)
+        return self.fallback(img0, img1, timestep=timestep)
+
+    def _capture(self, img0, img1, timestep):
+        static0, static1 = img0.clone(), img1.clone()
+        static_ts = timestep.clone() if timestep is not None else None
+        # warm up on a side stream (cuDNN benchmarking, lazy init) before capturing
+        side = torch.cuda.Stream()
+        side.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(side):
+            for _ in range(2):
+                self._forward(static0, static1, static_ts)
+        torch.cuda.current_stream().wait_stream(side)
+        graph = torch.cuda.CUDAGraph()
+        # Captures happen mid-run (partial last batch, OOM halving, first timestep call) while the reader and writer
+        # pools keep pinning memory and synchronizing events; thread-local capture keeps their CUDA calls legal.
+        # Older torch without the option would capture in global mode, so it runs eager instead.
+        try:
+            capture = torch.cuda.graph(graph, capture_error_mode='thread_local')
+        except TypeError:
+            raise RuntimeError('thread-local CUDA graph capture needs a newer torch')
+        with capture:
+            static_out = self._forward(static0, static1, static_ts)
+        return graph, static0, static1, static_ts, static_out
+
+    def __call__(self, img0, img1, *args, **kwargs):
+        # a timestep tensor is graph input like the images (one graph per timestep shape); anything else runs eager
+        timestep = kwargs.get('timestep')
+        if (args or set(kwargs) - {'timestep'} or not img0.is_cuda
+                or (timestep is not None and not (torch.is_tensor(timestep) and timestep.is_cuda))):
+            return self.fallback(img0, img1, *args, **kwargs)
+        key = (tuple(img0.shape), img0.dtype, img0.is_contiguous(memory_format=torch.channels_last),
+               None if timestep is None else tuple(timestep.shape))
+        if key not in self.graphs:
+            what = f"input {key[0]}" + ("" if timestep is None else " with timestep")
+            try:
+                self.graphs[key] = self._capture(img0, img1, timestep)
+                print(f"DEBUG: CUDA graph captured for {what}")
+            except Exception as e:
+                print(f"DEBUG: CUDA graph capture failed for {what}, running eager: {e}")
+                self.graphs[key] = None
+            sys.stdout.flush()
+        entry = self.graphs[key]
+        if entry is None:
+            return self._forward(img0, img1, timestep)
+        graph, static0, static1, static_ts, static_out = entry
+        static0.copy_(img0)
+        static1.copy_(img1)
+        if static_ts is not None:
+            static_ts.copy_(timestep)
+        graph.replay()
+        # the next replay overwrites static_out; callers may keep a result across calls (bisection node cache)
+        return static_out.clone()
+
+CUDA_GRAPH = os.environ.get('RIFE_CUDA_GRAPH', '0').lower() not in ('0', 'false', 'no', '')
+if CUDA_GRAPH and use_cuda:
+    if COMPILE or isinstance(model.inference, TRTInference):
+        # reduce-overhead compile and TensorRT already launch the forward as a graph/engine
+        print("DEBUG: RIFE_CUDA_GRAPH ignored (RIFE_COMPILE/RIFE_TRT active)")
+    else:
+        model.inference = CUDAGraphInference(model.inference)
+        print("DEBUG: CUDA graph replay enabled for midpoint inference")
+
+def mark_step():
+    """Tell cudagraph trees a new batch starts, so outputs of the previous one may be overwritten."""
+    if COMPILE and hasattr(torch, 'compiler') and hasattr(torch.compiler, 'cudagraph_mark_step_begin'):
+        torch.compiler.cudagraph_mark_step_begin()
+
 # --- A1: print diagnostics about torch/CUDA for remote debugging ---
 print(f"DEBUG: REPO_DIR={repo} model_dir={model_dir}")
 print(f"DEBUG: torch_version={getattr(torch, '__version__', 'n/a')} torch_cuda_version={getattr(torch.version, 'cuda', 'n/a')} cuda_available={use_cuda}")
@@ -496,9 +800,68 @@ if use_cuda:
 else:
     print('DEBUG: CUDA not available; running on CPU')
 
+# Timestep-conditioned models (RIFE v4 IFNet_HDv3, IFNet_m) produce the frame at any ratio in one forward
+# instead of up to rmaxcycles bisection forwards. RIFE_TIMESTEP=auto (default) | 1 (trust the signature) | 0 (bisect).
+TIMESTEP_MODE = os.environ.get('RIFE_TIMESTEP', 'auto').lower()
+try:
+    _timestep_param = inspect.signature(model.inference).parameters.get('timestep')
+except (TypeError, ValueError):
+    _timestep_param = None
+_accepts_timestep = _timestep_param is not None
+# midpoint calls leave `timestep` out when it defaults to 0.5 (RIFE v4 does), which keeps them on the
+# midpoint-only TensorRT / CUDA graph paths; a model with another default gets it passed explicitly
+_midpoint_timestep = _accepts_timestep and _timestep_param.default != 0.5
+# None until decided on the first non-static pair
+_timestep_ok = None if _accepts_timestep and TIMESTEP_MODE not in ('0', 'false', 'no', 'off') else False
+
+# built once per (ratios, N, dtype, device): torch.tensor() on a CUDA device is a blocking host->device copy
+_timestep_cache = {}
+
+def timestep_tensor(img, ratios):
+    """[len(ratios)*N,1,1,1] timestep tensor matching a batch of N pairs repeated once per ratio."""
+    key = (tuple(ratios), img.shape[0], img.dtype, img.device)
+    ts = _timestep_cache.get(key)
+    if ts is None:
+        ts = torch.tensor(ratios, dtype=img.dtype, device=img.device)
+        ts = _timestep_cache[key] = ts.repeat_interleave(img.shape[0]).view(-1, 1, 1, 1)
+    return ts
+
+def timestep_supported(img0, img1):
+    """Whether model.inference really honours `timestep` (some variants accept the argument and ignore it)."""
+    global _timestep_ok
+    if _timestep_ok is None:
+        if TIMESTEP_MODE != 'auto':
+            _timestep_ok = True
+        elif torch.equal(img0[:1], img1[:1]):
+            # a static pair cannot tell the two apart; bisect for now and decide on a later pair
+            return False
+        else:
+            with infer_ctx():
+                a = model.inference(img0[:1], img1[:1], timestep=timestep_tensor(img0[:1], [0.25])).clone()
+                b = model.inference(img0[:1], img1[:1], timestep=timestep_tensor(img0[:1], [0.75]))
+            _timestep_ok = not torch.allclose(a.float(), b.float(), rtol=0, atol=1e-3)
+        print(f"DEBUG: timestep-conditioned inference {'enabled' if _timestep_ok else 'unavailable, using bisection'}")
+        sys.stdout.flush()
+    return _timestep_ok
+
+def match_size(t, ref_h, ref_w):
+    """Pad (bottom/right) or crop a [N,C,H,W] tensor to ref_h x ref_w."""
+    pad_h = max(0, ref_h - t.shape[2])
+    pad_w = max(0, ref_w - t.shape[3])
+    if pad_h > 0 or pad_w > 0:
+        t = F.pad(t, (0, pad_w, 0, pad_h))
+    return t[:, :, :ref_h, :ref_w]
+
+def _cacheable(t):
+    """A model output that stays valid across later forwards: with RIFE_COMPILE (cudagraph trees) the output
+    memory is reused by the next compiled call, so cached bisection nodes must be copies."""
+    return t.clone() if COMPILE else t
+
 # helper: bisection-style inference for arbitrary ratio (copied logic from inference_img.py)
-def inference_with_ratio(model, img0, img1, ratio, rthreshold=0.02, rmaxcycles=12):
-    # img0/img1 are torch tensors on device, shape [1,C,H,W]
+def inference_with_ratio(model, img0, img1, ratio, rthreshold=0.02, rmaxcycles=12, cache=None):
+    # img0/img1 are torch tensors on device, shape [N,C,H,W]
+    # cache: optional {middle_ratio: middle} shared by the ratios of one pair batch. Every bisection node
+    # k/2^n has exactly one parent interval, so e.g. 0.25 and 0.75 both reuse the 0.5 forward.
     if ratio <= 0.0:
         return img0
     if ratio >= 1.0:
@@ -509,59 +872,133 @@ def inference_with_ratio(model, img0, img1, ratio, rthreshold=0.02, rmaxcycles=1
         return img0
     if ratio >= img1_ratio - rthreshold/2:
         return img1
+    # factor=2 (single mid at 0.5) is the model's native midpoint: one forward, no bisection bookkeeping.
+    # Checked before the timestep path and called without `timestep` where it defaults to 0.5, so the
+    # midpoint-only TensorRT engine / CUDA graph wrappers serve it instead of falling back to eager.
+    # Other dyadic ratios (k/2^n) already terminate after exactly n halvings in the loop below.
+    if abs(ratio - 0.5) < rthreshold/2:
+        if cache is not None and 0.5 in cache:
+            return cache[0.5]
+        with infer_ctx():
+            if _midpoint_timestep:
+                middle = model.inference(img0, img1, timestep=timestep_tensor(img0, [0.5]))
+            else:
+                middle = model.inference(img0, img1)
+        if cache is not None:
+            cache[0.5] = middle = _cacheable(middle)
+        return middle
+    if timestep_supported(img0, img1):
+        with infer_ctx():
+            return model.inference(img0, img1, timestep=timestep_tensor(img0, [ratio]))
     tmp_img0 = img0
     tmp_img1 = img1
+    # without a cache, narrowed endpoints are copied into two scratch buffers (allocated on first use) instead of
+    # rebinding to each middle, so every cycle sees the same input storage and the allocator recycles the output block
+    scratch0 = scratch1 = None
     for _ in range(rmaxcycles):
-        with torch.no_grad():
-            middle = model.inference(tmp_img0, tmp_img1)
-        # Ensure middle spatial dims match inputs (tmp_img0/tmp_img1) to avoid downstream mismatches
-        try:
-            ref_h, ref_w = tmp_img0.shape[2], tmp_img0.shape[3]
-            mh, mw = middle.shape[2], middle.shape[3]
-            if mh != ref_h or mw != ref_w:
-                # If middle is smaller, pad; if larger, crop
-                pad_h = max(0, ref_h - mh)
-                pad_w = max(0, ref_w - mw)
-                if pad_h > 0 or pad_w > 0:
-                    # pad bottom/right
-                    middle = F.pad(middle, (0, pad_w, 0, pad_h))
-                if middle.shape[2] > ref_h or middle.shape[3] > ref_w:
-                    middle = middle[:, :, :ref_h, :ref_w]
-        except Exception:
-            pass
         middle_ratio = (img0_ratio + img1_ratio) / 2.0
+        middle = cache.get(middle_ratio) if cache is not None else None
+        if middle is None:
+            with infer_ctx():
+                middle = model.inference(tmp_img0, tmp_img1)
+            # Ensure middle spatial dims match inputs (tmp_img0/tmp_img1) to avoid downstream mismatches;
+            # with 64-aligned inputs they always do, so this is one tuple compare per cycle
+            if middle.shape[2:] != tmp_img0.shape[2:]:
+                middle = match_size(middle, tmp_img0.shape[2], tmp_img0.shape[3])
+            if cache is not None:
+                cache[middle_ratio] = middle = _cacheable(middle)
         if (ratio - (rthreshold/2)) <= middle_ratio <= (ratio + (rthreshold/2)):
             return middle
-        if ratio > middle_ratio:
-            tmp_img0 = middle
-            img0_ratio = middle_ratio
-        else:
-            tmp_img1 = middle
-            img1_ratio = middle_ratio
+        if cache is not None:
+            # cached nodes must stay intact for the later ratios, so bisect on them directly
+            if ratio > middle_ratio:
+                tmp_img0, img0_ratio = middle, middle_ratio
+            else:
+                tmp_img1, img1_ratio = middle, middle_ratio
+            continue
+        with torch.inference_mode():
+            if ratio > middle_ratio:
+                if scratch0 is None:
+                    scratch0 = torch.empty_like(img0)
+                tmp_img0 = scratch0.copy_(middle)
+                img0_ratio = middle_ratio
+            else:
+                if scratch1 is None:
+                    scratch1 = torch.empty_like(img1)
+                tmp_img1 = scratch1.copy_(middle)
+                img1_ratio = middle_ratio
     # fallback: return last middle
     return middle
 
+# persistent uint8 output buffer on the inference device; re-allocated only when (H,W,C) changes
+_gpu_out_u8 = None
+# event of the last device->host copy out of _gpu_out_u8 (see stage_to_host)
+_last_copy = None
+
+def _scale_u8(out, hwc):
+    # mul allocates once; clamp_ runs in place; copy_ casts straight into the reused buffer
+    return out.copy_(hwc.mul(255.0).clamp_(0, 255))
+
+if COMPILE:
+    # Inductor fuses mul/clamp/cast into one elementwise kernel: the frame is read once and written once as uint8
+    try:
+        _scale_u8 = torch.compile(_scale_u8, dynamic=False)
+    except Exception as _e:
+        print(f"DEBUG: postprocess compile skipped: {_e}")
+
+def to_u8(frame):
+    """Scale a [C,H,W] float frame in [0,1] to a uint8 [H,W,C] frame without the extra clamp/byte temporaries."""
+    global _gpu_out_u8
+    # HWC is what cv2 wants; for a channels_last frame the permute is a free stride change
+    hwc = frame.permute(1,2,0)
+    if _gpu_out_u8 is None or _gpu_out_u8.shape != hwc.shape or _gpu_out_u8.device != hwc.device:
+        _gpu_out_u8 = torch.empty(hwc.shape, dtype=torch.uint8, device=hwc.device)
+    elif _last_copy is not None:
+        # the previous mid may still be on its way to the host out of this buffer
+        torch.cuda.current_stream().wait_event(_last_copy)
+    return _scale_u8(_gpu_out_u8, hwc)
+
+def _frame_key(name):
+    # extracted frames are <prefix><number>.<ext>; an int key sorts them without comparing long strings
+    m = re.fullmatch(r'(.*?)(\d+)\.[A-Za-z]+', name)
+    return (m.group(1), int(m.group(2))) if m else None
+
 # discover image files (PNG/JPG/JPEG) and emit diagnostics for remote debugging
-raw_files = sorted([os.path.join(in_dir, p) for p in os.listdir(in_dir) if p.lower().endswith(('.png', '.jpg', '.jpeg'))])
-print(f"DEBUG: scanning input dir={in_dir} found_pngs={len(raw_files)}")
-for f in raw_files[:20]:
+# basenames only, straight from the directory entries (no joined paths for every frame)
+with os.scandir(in_dir) as _it:
+    imgs = [e.name for e in _it if e.name.lower().endswith(('.png', '.jpg', '.jpeg'))]
+_keys = [_frame_key(n) for n in imgs]
+if imgs and None not in _keys:
+    imgs = [n for _, n in sorted(zip(_keys, imgs))]
+else:
+    imgs.sort()
+del _keys
+print(f"DEBUG: scanning input dir={in_dir} found_pngs={len(imgs)}")
+for name in imgs[:20]:
+    f = os.path.join(in_dir, name)
     try:
         st = os.stat(f)
         print(f"DEBUG: file={f} size={st.st_size} mode={oct(st.st_mode)}")
     except Exception as _e:
         print(f"DEBUG: file={f} stat_failed: {_e}")
 
-# Use just basenames for processing like original code expected
-imgs = [os.path.basename(p) for p in raw_files]
-
 if not os.path.exists(out_dir):
     os.makedirs(out_dir, exist_ok=True)
 
 # Determine number of mids per pair
 mids_per_pair = max(0, int(round(factor)) - 1)
+# mids are generated at ratios k/(mids_per_pair+1)
+ratios = [float(k) / float(mids_per_pair + 1) for k in range(1, mids_per_pair + 1)]
 
 total_pairs = max(0, len(imgs)-1)
 print(f"Batch-runner: {len(imgs)} frames -> {total_pairs} pairs to process")
+# a shard child (RIFE_SHARD=k/n) handles pairs [pair_lo, pair_hi), i.e. frames pair_lo..pair_hi; output names stay global
+pair_lo, pair_hi = 0, total_pairs
+if SHARD:
+    _k, _n = (int(x) for x in SHARD.split('/'))
+    pair_lo, pair_hi = _k * total_pairs // _n, (_k + 1) * total_pairs // _n
+    print(f"Batch-runner: shard {SHARD} -> pairs {pair_lo+1}..{pair_hi}")
+shard_pairs = pair_hi - pair_lo
 sys.stdout.flush()
 
 # --- A2: start timing for ETA/rate reporting ---
@@ -569,6 +1006,24 @@ start_time = time.time()
 REPORT_INTERVAL = int(os.environ.get('BATCH_RATE_REPORT_INTERVAL', '5'))
 _last_report_time = start_time
 _last_reported_count = 0
+# device names/sizes do not change during a run: format them once for the RATE line
+GPU_INFO = 'n/a'
+if use_cuda:
+    try:
+        _gpu_info = []
+        for idx in range(torch.cuda.device_count()):
+            try:
+                p = torch.cuda.get_device_properties(idx)
+                _gpu_info.append(f"{p.name}:{(p.total_memory//1024**2) if hasattr(p, 'total_memory') else 'n/a'}MB")
+            except Exception:
+                pass
+        GPU_INFO = ','.join(_gpu_info) if _gpu_info else 'n/a'
+    except Exception:
+        GPU_INFO = 'n/a'
+# allocator stats are only refreshed every RATE_MEM_INTERVAL pairs (and on the last one); in between the RATE
+# line repeats the previous values, so the report does not take the allocator lock at every interval
+RATE_MEM_INTERVAL = max(1, int(os.environ.get('BATCH_RATE_MEM_INTERVAL', '50')))
+_last_mem = (None, None)
 
 def _format_eta(sec):
     try:
@@ -582,242 +1037,426 @@ def _format_eta(sec):
     return f"{h:02d}:{m:02d}:{s:02d}"
 
 def print_rate(processed):
-    global _last_report_time, _last_reported_count
+    global _last_report_time, _last_reported_count, _last_mem
     now = time.time()
     elapsed = now - start_time if start_time else 0.0
     total_fps = (processed / elapsed) if elapsed > 0 else 0.0
     interval_elapsed = now - (_last_report_time or start_time)
     inst_fps = (processed - (_last_reported_count or 0)) / interval_elapsed if interval_elapsed > 0 else 0.0
-    eta = int((total_pairs - processed) / total_fps) if total_fps > 0 else -1
+    eta = int((shard_pairs - processed) / total_fps) if total_fps > 0 else -1
     if use_cuda:
-        try:
-            reserved = torch.cuda.memory_reserved(0)//1024**2 if hasattr(torch.cuda, 'memory_reserved') else None
-            allocated = torch.cuda.memory_allocated(0)//1024**2 if hasattr(torch.cuda, 'memory_allocated') else None
-        except Exception:
-            reserved = allocated = None
-        try:
-            gpu_info = []
-            for idx in range(torch.cuda.device_count()):
-                try:
-                    p = torch.cuda.get_device_properties(idx)
-                    gpu_info.append(f"{p.name}:{(p.total_memory//1024**2) if hasattr(p, 'total_memory') else 'n/a'}MB")
-                except Exception:
-                    pass
-            gpu_info = ','.join(gpu_info) if gpu_info else 'n/a'
-        except Exception:
-            gpu_info = 'n/a'
+        if _last_mem == (None, None) or processed % RATE_MEM_INTERVAL == 0 or processed == shard_pairs:
+            try:
+                _last_mem = (torch.cuda.memory_reserved(0)//1024**2 if hasattr(torch.cuda, 'memory_reserved') else None,
+                             torch.cuda.memory_allocated(0)//1024**2 if hasattr(torch.cuda, 'memory_allocated') else None)
+            except Exception:
+                _last_mem = (None, None)
+        reserved, allocated = _last_mem
     else:
         reserved = allocated = None
-        gpu_info = 'n/a'
 
-    print(f"RATE: processed={processed}/{total_pairs} elapsed_s={int(elapsed)} avg_fps={total_fps:.2f} inst_fps={inst_fps:.2f} ETA={_format_eta(eta)} reserved_MB={reserved} allocated_MB={allocated} gpus={gpu_info}")
+    print(f"RATE: processed={processed}/{shard_pairs} elapsed_s={int(elapsed)} avg_fps={total_fps:.2f} inst_fps={inst_fps:.2f} ETA={_format_eta(eta)} reserved_MB={reserved} allocated_MB={allocated} gpus={GPU_INFO}")
     sys.stdout.flush()
     _last_report_time = now
     _last_reported_count = processed
 
-# --- A2: periodic rate/ETA and memory report ---
-processed = 0
-for i in range(len(imgs)-1):
-    a_path = os.path.join(in_dir, imgs[i])
-    b_path = os.path.join(in_dir, imgs[i+1])
-    try:
-        # Ensure files exist and are readable before attempting to imread
-        if not os.path.isfile(a_path):
-            print(f"MISSING: {a_path} does not exist; listing input dir sample: {os.listdir(in_dir)[:10]}")
-            sys.stdout.flush()
-            continue
-        if not os.path.isfile(b_path):
-            print(f"MISSING: {b_path} does not exist; listing input dir sample: {os.listdir(in_dir)[:10]}")
-            sys.stdout.flush()
-            continue
+# error reporting stays to one line per bad frame/pair; tracebacks (RIFE_DEBUG=1) and input dumps
+# (SAVE_BAD_PAIRS=1) are opt-in so flaky storage does not turn the error path into the hot path
+DEBUG = os.environ.get('RIFE_DEBUG', '0').lower() not in ('0', 'false', 'no', '')
+SAVE_BAD_PAIRS = os.environ.get('SAVE_BAD_PAIRS', '0').lower() not in ('0', 'false', 'no', '')
 
-        im0 = cv2.imread(a_path, cv2.IMREAD_UNCHANGED)
-        im1 = cv2.imread(b_path, cv2.IMREAD_UNCHANGED)
-        # If OpenCV cannot read the image, try a Pillow fallback (common in minimal containers)
-        if im0 is None:
-            try:
-                from PIL import Image
-                pil = Image.open(a_path).convert('RGB')
-                im0 = np.array(pil)[:,:,::-1]  # PIL gives RGB, convert to BGR to match cv2's convention
-                print(f"PIL_FALLBACK_OK: {a_path}")
-            except Exception as e:
-                print(f"CV2_IMREAD_FAILED: {a_path} returned None from cv2.imread; attempting raw-inspect; PIL failed: {e}")
-                try:
-                    with open(a_path, 'rb') as fh:
-                        head = fh.read(128)
-                    print(f"RAW_HDR({a_path}) len={len(head)} bytes header_hex={head[:16].hex()}")
-                    # copy raw file for offline inspection
-                    badcopy = os.path.join(out_dir, f'bad_raw_{os.path.basename(a_path)}')
-                    try:
-                        import shutil
-                        shutil.copy2(a_path, badcopy)
-                        print(f"Copied bad raw file to {badcopy}")
-                    except Exception as _e:
-                        print(f"Failed to copy bad raw file: {_e}")
-                except Exception as _e:
-                    print(f"Failed to open raw file {a_path}: {_e}")
-                sys.stdout.flush()
-                continue
-        if im1 is None:
-            try:
-                from PIL import Image
-                pil = Image.open(b_path).convert('RGB')
-                im1 = np.array(pil)[:,:,::-1]
-                print(f"PIL_FALLBACK_OK: {b_path}")
-            except Exception as e:
-                print(f"CV2_IMREAD_FAILED: {b_path} returned None from cv2.imread; attempting raw-inspect; PIL failed: {e}")
-                try:
-                    with open(b_path, 'rb') as fh:
-                        head = fh.read(128)
-                    print(f"RAW_HDR({b_path}) len={len(head)} bytes header_hex={head[:16].hex()}")
-                    badcopy = os.path.join(out_dir, f'bad_raw_{os.path.basename(b_path)}')
-                    try:
-                        import shutil
-                        shutil.copy2(b_path, badcopy)
-                        print(f"Copied bad raw file to {badcopy}")
-                    except Exception as _e:
-                        print(f"Failed to copy bad raw file: {_e}")
-                except Exception as _e:
-                    print(f"Failed to open raw file {b_path}: {_e}")
-                sys.stdout.flush()
-                continue
+# Normalize and convert image dtypes robustly.
+# Cases handled:
+#  - uint16 (common when ffmpeg outputs 16-bit PNG): keep the high byte -> uint8
+#  - float32/float64 in [0,1] or [0,255]: normalize to float32 [0,1]
+#  - int types >8-bit: clamp/scale to uint8
+def normalize_img(img):
+    if img.dtype == np.uint8:
+        return img
+    if img.dtype == np.uint16:
+        # downscale 16-bit -> 8-bit
+        return (img >> 8).astype(np.uint8)
+    if img.dtype in (np.float32, np.float64):
+        # assume floats in [0,1] or [0,255]
+        mx = img.max() if img.size>0 else 1.0
+        if mx <= 1.0:
+            return (np.clip(img, 0.0, 1.0) * 255.0).astype(np.uint8)
+        else:
+            return (np.clip(img, 0.0, 255.0)).astype(np.uint8)
+    # other integer types (int16, int32, etc.) - coerce to uint8 via clipping/scaling
+    if np.issubdtype(img.dtype, np.signedinteger) or np.issubdtype(img.dtype, np.integer):
+        # clip to [0,255]
+        return np.clip(img, 0, 255).astype(np.uint8)
+    # fallback: convert to uint8 via scaling
+    try:
+        return img.astype(np.uint8)
+    except Exception:
+        return (np.clip(img, 0, 255)).astype(np.uint8)
 
-        # convert to torch tensor [1,C,H,W], normalize if uint8
-        # Ensure images have 3 channels; if grayscale, convert to 3-channel
-        if im0.ndim == 2:
-            im0 = np.stack([im0, im0, im0], axis=2)
-        if im1.ndim == 2:
-            im1 = np.stack([im1, im1, im1], axis=2)
-
-        # Normalize and convert image dtypes robustly.
-        # Cases handled:
-        #  - uint16 (common when ffmpeg outputs 16-bit PNG): scale down by 256 -> uint8
-        #  - float32/float64 in [0,1] or [0,255]: normalize to float32 [0,1]
-        #  - int types >8-bit: clamp/scale to uint8
-        def normalize_img(img):
-            if img.dtype == np.uint8:
-                return img
-            if img.dtype == np.uint16:
-                # downscale 16-bit -> 8-bit
-                return (img // 256).astype(np.uint8)
-            if img.dtype in (np.float32, np.float64):
-                # assume floats in [0,1] or [0,255]
-                mx = img.max() if img.size>0 else 1.0
-                if mx <= 1.0:
-                    return (np.clip(img, 0.0, 1.0) * 255.0).astype(np.uint8)
-                else:
-                    return (np.clip(img, 0.0, 255.0)).astype(np.uint8)
-            # other integer types (int16, int32, etc.) - coerce to uint8 via clipping/scaling
-            if np.issubdtype(img.dtype, np.signedinteger) or np.issubdtype(img.dtype, np.integer):
-                # clip to [0,255]
-                return np.clip(img, 0, 255).astype(np.uint8)
-            # fallback: convert to uint8 via scaling
-            try:
-                return img.astype(np.uint8)
-            except Exception:
-                return (np.clip(img, 0, 255)).astype(np.uint8)
-
-        im0 = normalize_img(im0)
-        im1 = normalize_img(im1)
-
-        # Create torch tensors [1,C,H,W] in float32 normalized to [0,1]
-        t0 = torch.from_numpy(im0.transpose(2,0,1)).unsqueeze(0).float() / 255.0
-        t1 = torch.from_numpy(im1.transpose(2,0,1)).unsqueeze(0).float() / 255.0
-
-        # Pad to multiples of 64 (match model expectations observed in runtime errors)
-        n,c,h,w = t0.shape
-        ph = ((h - 1) // 64 + 1) * 64
-        pw = ((w - 1) // 64 + 1) * 64
-        pad = (0, pw - w, 0, ph - h)
-        if pad[1] != 0 or pad[3] != 0:
-            t0 = F.pad(t0, pad)
-            t1 = F.pad(t1, pad)
-        t0 = t0.to(device)
-        t1 = t1.to(device)
-        # debug: print shapes so remote logs can capture them
-        print(f"DEBUG: input shapes after pad t0={tuple(t0.shape)} t1={tuple(t1.shape)} mids_per_pair={mids_per_pair}")
+def load_image(path):
+    """Read a frame as 3-channel uint8 HWC (BGR). Returns None (after printing diagnostics) if unreadable."""
+    # one plain sequential read, then decode from memory: slow/network storage is hit once per frame and the
+    # fallbacks below reuse the same bytes (decode workers overlap these reads with each other)
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+    except OSError as e:
+        print(f"CV2_IMREAD_FAILED: {path} could not be read: {e}")
         sys.stdout.flush()
-
-        if mids_per_pair <= 0:
-            try:
-                with torch.no_grad():
-                    mid = model.inference(t0, t1)
-                # CRITICAL: Crop back to ORIGINAL size (h, w) to avoid jumping frames
-                # mid might be padded size, need to crop to original dimensions
-                mid = mid[:, :, :h, :w]
-            except Exception:
-                print('ERROR: inference call failed; tensor shapes:')
+        return None
+    im = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED) if data else None
+    # If OpenCV cannot read the image, try a Pillow fallback (common in minimal containers)
+    if im is None:
+        try:
+            import io
+            from PIL import Image
+            pil = Image.open(io.BytesIO(data)).convert('RGB')
+            im = np.array(pil)[:,:,::-1]  # PIL gives RGB, convert to BGR to match cv2's convention
+            print(f"PIL_FALLBACK_OK: {path}")
+        except Exception as e:
+            # one line per unreadable frame; the raw copy is only made on request
+            print(f"CV2_IMREAD_FAILED: {path} len={len(data)} header_hex={data[:16].hex()} PIL failed: {e}")
+            if SAVE_BAD_PAIRS:
                 try:
-                    print(f"t0.shape={tuple(t0.shape)} t1.shape={tuple(t1.shape)}")
+                    import shutil
+                    shutil.copy2(path, os.path.join(out_dir, f'bad_raw_{os.path.basename(path)}'))
                 except Exception:
                     pass
-                traceback.print_exc()
-                sys.stdout.flush()
-                raise
-            # save as single mid for compatibility
-            try:
-                out_np = (mid[0] * 255.0).clamp(0,255).byte().cpu().numpy().transpose(1,2,0)
-            except Exception:
-                out_np = mid[0].byte().cpu().numpy().transpose(1,2,0)
-            out_path = os.path.join(out_dir, f'frame_%06d_mid.png' % (i+1))
-            cv2.imwrite(out_path, out_np)
-            # free memory
-            del mid, out_np
-            if use_cuda:
-                torch.cuda.empty_cache()
-            # progress
-            print(f"Batch-runner: pair {i+1}/{total_pairs} done (single mid)")
             sys.stdout.flush()
+            return None
+    # Ensure images have 3 channels; if grayscale, convert to 3-channel
+    if im.ndim == 2:
+        im = np.stack([im, im, im], axis=2)
+    return normalize_img(im)
 
-            processed += 1
-            if processed % REPORT_INTERVAL == 0 or processed == total_pairs:
-                print_rate(processed)
-        else:
-            # generate mids at ratios k/(mids_per_pair+1)
-            for k in range(1, mids_per_pair+1):
-                ratio = float(k) / float(mids_per_pair + 1)
-                mid = inference_with_ratio(model, t0, t1, ratio)
-                # CRITICAL: Crop back to ORIGINAL size (h, w) to avoid jumping frames
-                mid = mid[:, :, :h, :w]
-                # save with index
-                try:
-                    out_np = (mid[0] * 255.0).clamp(0,255).byte().cpu().numpy().transpose(1,2,0)
-                except Exception:
-                    out_np = mid[0].byte().cpu().numpy().transpose(1,2,0)
-                out_path = os.path.join(out_dir, f'frame_%06d_mid_%02d.png' % (i+1, k))
-                cv2.imwrite(out_path, out_np)
-                del mid, out_np
-                if use_cuda:
-                    torch.cuda.empty_cache()
-            # progress for multi-mid case
-            print(f"Batch-runner: pair {i+1}/{total_pairs} done ({mids_per_pair} mids)")
+def prep_host(im):
+    """uint8 HWC frame -> host tensor for upload (pinned for CUDA). Returns (t, h, w).
+    Layout change, normalization and padding happen on the device in stack_inputs()."""
+    t = torch.from_numpy(np.ascontiguousarray(im))
+    if use_cuda:
+        # page-locked memory lets the H2D copy run asynchronously on the upload stream
+        t = t.pin_memory()
+    return t, im.shape[0], im.shape[1]
+
+# uploads run on their own stream so they can overlap with inference still queued on the default stream
+upload_stream = torch.cuda.Stream() if use_cuda else None
+# Padding happens on the device after the unpadded uint8 upload, so the pad area never crosses PCIe.
+# RIFE_PAD_MODE=constant (zeros, as upstream RIFE) | replicate | reflect; the pad is cropped off every mid anyway.
+PAD_MODE = os.environ.get('RIFE_PAD_MODE', 'constant').lower()
+if PAD_MODE not in ('constant', 'replicate', 'reflect'):
+    print(f"DEBUG: unknown RIFE_PAD_MODE={PAD_MODE}, using constant")
+    PAD_MODE = 'constant'
+
+def upload(host_t):
+    """Copy a prepared host frame (uint8 HWC) to the inference device. Normalization and padding happen
+    later, straight into the batched model input (stack_inputs)."""
+    if upload_stream is None:
+        return host_t.to(device=device)
+    with torch.cuda.stream(upload_stream):
+        t = host_t.to(device=device, non_blocking=True)
+    torch.cuda.current_stream().wait_stream(upload_stream)
+    t.record_stream(torch.cuda.current_stream())
+    return t
+
+# Pairs are batched along N: all pairs of a directory normally share one padded (ph,pw), so up to
+# BATCH_PAIRS pairs go through a single model.inference call. A shape change flushes the batch early.
+BATCH_PAIRS = max(1, int(os.environ.get('RIFE_BATCH', '8')))
+print(f"DEBUG: batching up to {BATCH_PAIRS} pairs per inference call (RIFE_BATCH)")
+
+# Three-stage pipeline: a reader thread decodes + preps frames ahead of the GPU, the main thread only
+# runs inference, and a writer pool encodes PNGs. Queues are bounded so memory stays flat.
+PREFETCH = max(1, int(os.environ.get('RIFE_PREFETCH', '8')))
+WRITE_WORKERS = max(1, int(os.environ.get('RIFE_WRITE_WORKERS', '4')))
+writer = ThreadPoolExecutor(max_workers=WRITE_WORKERS)
+write_futures = deque()
+# PNG stays lossless; zlib level 1 instead of OpenCV's default 3 keeps the deflate cost off the critical path
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, int(os.environ.get('RIFE_PNG_COMPRESSION', '1')),
+              cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_DEFAULT]
+
+# D2H staging: mids are copied into a ring of page-locked host frames on a dedicated copy stream, and the
+# writer encodes straight out of its slot. The copy no longer stalls the main thread, overlaps the next
+# inference, and needs no extra host-side copy. A slot is reused only after its write finished: save_mid
+# keeps at most WRITE_WORKERS*2 writes in flight, so one more slot than that is enough.
+STAGING_SLOTS = WRITE_WORKERS * 2 + 1
+copy_stream = torch.cuda.Stream() if use_cuda else None
+_staging = []
+_staging_idx = 0
+
+def stage_to_host(u8):
+    """Start copying a uint8 [H,W,C] frame into the next staging slot. Returns (host tensor, event or None)."""
+    global _staging_idx, _last_copy
+    if not _staging or _staging[0].shape != u8.shape:
+        # slots still referenced by queued writes stay alive until those writes drop them
+        _staging[:] = [torch.empty(u8.shape, dtype=torch.uint8, pin_memory=use_cuda) for _ in range(STAGING_SLOTS)]
+    host = _staging[_staging_idx]
+    _staging_idx = (_staging_idx + 1) % STAGING_SLOTS
+    if copy_stream is None:
+        host.copy_(u8)
+        return host, None
+    copy_stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(copy_stream):
+        host.copy_(u8, non_blocking=True)
+        ev = torch.cuda.Event()
+        ev.record(copy_stream)
+    u8.record_stream(copy_stream)
+    _last_copy = ev
+    return host, ev
+
+def write_staged(out_path, host, ev):
+    """Writer-side half of stage_to_host: wait for the copy to land, then encode the slot in place."""
+    if ev is not None:
+        ev.synchronize()
+    return cv2.imwrite(out_path, host.numpy(), PNG_PARAMS)
+
+def drain_writes(limit):
+    while len(write_futures) > limit:
+        fut = write_futures.popleft()
+        try:
+            fut.result()
+        except Exception as e:
+            print(f"WRITE_FAILED: {e}")
             sys.stdout.flush()
 
-            processed += 1
-            if processed % REPORT_INTERVAL == 0 or processed == total_pairs:
-                print_rate(processed)
+def save_mid(mid, b, out_path):
+    try:
+        host, ev = stage_to_host(to_u8(mid[b]))
+        write_futures.append(writer.submit(write_staged, out_path, host, ev))
+    except Exception:
+        out_np = mid[b].byte().cpu().numpy().transpose(1,2,0)
+        # hand the writer its own contiguous copy
+        write_futures.append(writer.submit(cv2.imwrite, out_path, np.ascontiguousarray(out_np), PNG_PARAMS))
+    drain_writes(WRITE_WORKERS * 2)
 
-        # free per-pair tensors
-        del t0, t1, im0, im1
-        if use_cuda:
-            torch.cuda.empty_cache()
+# persistent, pre-padded batched model inputs, one per side; re-allocated only when the batch shape changes
+_batch_bufs = [None, None]
 
-    except Exception as e:
-        # Attempt to save the offending input pair for offline debugging
+def stack_inputs(side, frames):
+    """uint8 HWC device frames -> the reused [N,C,ph,pw] infer_dtype model input of this side: normalized to
+    [0,1], padded to multiples of 64 (match model expectations observed in runtime errors), channels_last."""
+    h, w, c = frames[0].shape
+    ph = ((h - 1) // 64 + 1) * 64
+    pw = ((w - 1) // 64 + 1) * 64
+    shape = (len(frames), c, ph, pw)
+    buf = _batch_bufs[side]
+    if buf is None or tuple(buf.shape) != shape or buf.dtype != infer_dtype or buf.device != frames[0].device:
+        # zero-filled once: with constant padding the border is never written again
+        buf = torch.zeros(shape, dtype=infer_dtype, device=frames[0].device, memory_format=torch.channels_last)
+        _batch_bufs[side] = buf
+    for b, f in enumerate(frames):
+        # permute is a free stride change (both sides are NHWC in memory); copy_ casts uint8 into the slot
+        buf[b, :, :h, :w].copy_(f.permute(2, 0, 1))
+    buf[:, :, :h, :w].div_(255.0)
+    if PAD_MODE != 'constant' and (ph != h or pw != w):
+        buf.copy_(F.pad(buf[:, :, :h, :w], (0, pw - w, 0, ph - h), mode=PAD_MODE))
+    return buf
+
+def run_batch(batch):
+    """Run inference for a list of same-shape pairs and write their mids.
+    Each entry is (i, a_path, b_path, im0, im1, t0, t1, h, w)."""
+    h, w = batch[0][7], batch[0][8]
+    mark_step()
+    t0 = stack_inputs(0, [e[5] for e in batch])
+    t1 = stack_inputs(1, [e[6] for e in batch])
+    # debug: print shapes so remote logs can capture them
+    print(f"DEBUG: input shapes after pad t0={tuple(t0.shape)} t1={tuple(t1.shape)} mids_per_pair={mids_per_pair}")
+    sys.stdout.flush()
+    if mids_per_pair <= 0:
+        # failures propagate to flush(), which reports them once per pair
+        with infer_ctx():
+            mid = model.inference(t0, t1)
+        # CRITICAL: Crop back to ORIGINAL size (h, w) to avoid jumping frames
+        # mid might be padded size, need to crop to original dimensions
+        mid = mid[:, :, :h, :w]
+        # save as single mid for compatibility
+        for b, e in enumerate(batch):
+            save_mid(mid, b, os.path.join(out_dir, f'frame_%06d_mid.png' % (e[0]+1)))
+    elif len(ratios) > 1 and timestep_supported(t0, t1):
+        # every ratio of every pair in one forward: inputs are repeated once per ratio along N
+        n = len(batch)
+        with infer_ctx():
+            mids = model.inference(torch.cat([t0] * len(ratios), dim=0), torch.cat([t1] * len(ratios), dim=0),
+                                   timestep=timestep_tensor(t0, ratios))
+        for k in range(1, mids_per_pair+1):
+            # CRITICAL: Crop back to ORIGINAL size (h, w) to avoid jumping frames
+            mid = mids[(k-1)*n:k*n, :, :h, :w]
+            for b, e in enumerate(batch):
+                save_mid(mid, b, os.path.join(out_dir, f'frame_%06d_mid_%02d.png' % (e[0]+1, k)))
+    else:
+        # bisection state is per-ratio, so it is shared by the whole batch; nodes are shared across ratios
+        nodes = {} if len(ratios) > 1 else None
+        for k, ratio in enumerate(ratios, 1):
+            mid = inference_with_ratio(model, t0, t1, ratio, cache=nodes)
+            # CRITICAL: Crop back to ORIGINAL size (h, w) to avoid jumping frames
+            mid = mid[:, :, :h, :w]
+            # save with index
+            for b, e in enumerate(batch):
+                save_mid(mid, b, os.path.join(out_dir, f'frame_%06d_mid_%02d.png' % (e[0]+1, k)))
+
+def report_bad_pair(e, exc):
+    i, a_path, b_path, im0, im1 = e[:5]
+    print(f"Exception processing pair {a_path} {b_path} -> {type(exc).__name__}: {exc}")
+    if DEBUG:
+        traceback.print_exc()
+    if SAVE_BAD_PAIRS:
+        # save the offending input pair for offline debugging
+        badbase = os.path.join(out_dir, f'bad_pair_{i+1}')
         try:
-            if 'im0' in locals() and 'im1' in locals():
-                badbase = os.path.join(out_dir, f'bad_pair_{i+1}')
-                try:
-                    cv2.imwrite(badbase + '_a.png', im0)
-                    cv2.imwrite(badbase + '_b.png', im1)
-                    print(f"Saved bad pair to {badbase}_a.png and {badbase}_b.png")
-                except Exception:
-                    pass
+            cv2.imwrite(badbase + '_a.png', im0)
+            cv2.imwrite(badbase + '_b.png', im1)
+            print(f"Saved bad pair to {badbase}_a.png and {badbase}_b.png")
         except Exception:
             pass
-        print('Exception processing pair', a_path, b_path, '->', e)
-        traceback.print_exc()
+    sys.stdout.flush()
+
+def flush(batch):
+    global BATCH_PAIRS
+    if not batch:
+        return
+    try:
+        run_batch(batch)
+        done = batch
+    except Exception as exc:
+        done = []
+        if use_cuda and 'out of memory' in str(exc).lower():
+            # only an OOM justifies returning cached blocks to the driver before retrying smaller
+            torch.cuda.empty_cache()
+            if len(batch) > 1:
+                # later batches would hit the same wall: halve the batch size for the rest of the run
+                BATCH_PAIRS = max(1, len(batch) // 2)
+                print(f"DEBUG: OOM with {len(batch)} pairs per call; continuing with RIFE_BATCH={BATCH_PAIRS}")
+        if len(batch) == 1:
+            report_bad_pair(batch[0], exc)
+        else:
+            # retry pair-by-pair so a single bad pair does not cost the whole batch
+            for e in batch:
+                try:
+                    run_batch([e])
+                    done.append(e)
+                except Exception as exc1:
+                    report_bad_pair(e, exc1)
+    for e in done:
+        pair_done(e[0])
+    # drop the batch's tensors; identically-shaped blocks are recycled by the caching allocator
+    batch.clear()
+
+def pair_done(i, note=''):
+    global processed
+    # progress
+    if mids_per_pair <= 0:
+        print(f"Batch-runner: pair {i+1}/{total_pairs} done (single mid{note})")
+    else:
+        print(f"Batch-runner: pair {i+1}/{total_pairs} done ({mids_per_pair} mids{note})")
+    sys.stdout.flush()
+    processed += 1
+    if processed % REPORT_INTERVAL == 0 or processed == shard_pairs:
+        print_rate(processed)
+
+# Static pairs skip the GPU: if no 30x17-ish block (64x64 grid) of |im1-im0| averages above RIFE_STATIC_THRESHOLD
+# (uint8 levels), the mids are plain blends of the two frames. The block max, not the global mean, is compared
+# so a small moving object on a still background is never skipped. Blends differ from model output, so the check
+# is opt-in: 0 (default) disables it; ~1.5 skips only visually identical pairs.
+STATIC_THRESHOLD = float(os.environ.get('RIFE_STATIC_THRESHOLD', '0'))
+
+def is_static(im0, im1):
+    if STATIC_THRESHOLD <= 0 or im0.shape != im1.shape:
+        return False
+    diff = cv2.absdiff(im0, im1)
+    return cv2.resize(diff, (64, 64), interpolation=cv2.INTER_AREA).max() < STATIC_THRESHOLD
+
+def write_blends(i, im0, im1):
+    """Write the mids of a static pair as ratio-weighted blends of its two frames."""
+    if mids_per_pair <= 0:
+        outs = [(os.path.join(out_dir, f'frame_%06d_mid.png' % (i+1)), 0.5)]
+    else:
+        outs = [(os.path.join(out_dir, f'frame_%06d_mid_%02d.png' % (i+1, k)), r) for k, r in enumerate(ratios, 1)]
+    for out_path, r in outs:
+        write_futures.append(writer.submit(cv2.imwrite, out_path, cv2.addWeighted(im0, 1.0 - r, im1, r, 0.0), PNG_PARAMS))
+        drain_writes(WRITE_WORKERS * 2)
+
+def decode_frame(j):
+    """Decode and prep frame j. Returns (j, path, item); item is None for an unusable frame."""
+    path = os.path.join(in_dir, imgs[j])
+    item = None
+    try:
+        # names come from the directory scan, so no per-frame existence probe; a vanished file fails in load_image
+        im = load_image(path)
+        if im is not None:
+            host_t, h, w = prep_host(im)
+            item = (im, host_t, h, w)
+        elif os.environ.get('BATCH_DEBUG_MISSING') and not os.path.isfile(path):
+            print(f"MISSING: {path} does not exist; listing input dir sample: {os.listdir(in_dir)[:10]}")
+            sys.stdout.flush()
+    except Exception as e:
+        print(f"READ_FAILED: {path} -> {e}")
         sys.stdout.flush()
+    return (j, path, item)
+
+# cv2.imread releases the GIL inside libpng, so a small pool decodes the next frames in parallel
+DECODE_WORKERS = max(1, int(os.environ.get('RIFE_DECODE_WORKERS', str(min(8, os.cpu_count() or 1)))))
+
+def read_frames(q):
+    """Reader stage: decode and prep every frame once, handing them over in order."""
+    frames = range(pair_lo, min(len(imgs), pair_hi + 1))
+    if len(frames) < 2 or DECODE_WORKERS == 1:
+        # nothing to overlap with; skip the pool
+        for j in frames:
+            q.put(decode_frame(j))
+        q.put(None)
+        return
+    with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+        # keep PREFETCH decodes in flight ahead of the consumer; results are queued in frame order
+        futures = deque(pool.submit(decode_frame, j) for j in frames[:PREFETCH])
+        nxt = len(futures)
+        while futures:
+            q.put(futures.popleft().result())
+            if nxt < len(frames):
+                futures.append(pool.submit(decode_frame, frames[nxt]))
+                nxt += 1
+    q.put(None)
+
+# --- A2: periodic rate/ETA and memory report ---
+processed = 0
+pending = []
+frame_q = queue.Queue(maxsize=PREFETCH)
+reader = threading.Thread(target=read_frames, args=(frame_q,), daemon=True)
+reader.start()
+prev = frame_q.get()
+# sliding window: frame i+1's device tensor is pair i's t1 and pair i+1's t0, so each frame is uploaded once
+prev_dev = None
+while prev is not None:
+    cur = frame_q.get()
+    if cur is None:
+        break
+    (i, a_path, a), (_, b_path, b) = prev, cur
+    prev = cur
+    t_prev, prev_dev = prev_dev, None
+    if a is None or b is None:
+        continue
+    im0, im1 = a[0], b[0]
+    try:
+        if is_static(im0, im1):
+            write_blends(i, im0, im1)
+            pair_done(i, ', static')
+            continue
+        # uint8 HWC device tensors; stack_inputs turns a batch of them into the padded model input
+        t0 = t_prev if t_prev is not None else upload(a[1])
+        t1 = upload(b[1])
+        prev_dev = t1
+        h, w = a[2], a[3]
+
+        entry = (i, a_path, b_path, im0, im1, t0, t1, h, w)
+        if pending and (pending[0][5].shape != t0.shape or pending[0][7:9] != (h, w)):
+            flush(pending)
+        pending.append(entry)
+        if len(pending) >= BATCH_PAIRS:
+            flush(pending)
+
+    except Exception as e:
+        report_bad_pair((i, a_path, b_path, im0, im1), e)
+
+flush(pending)
+drain_writes(0)
+writer.shutdown()
 
 # After discovery, print which method succeeded for debugging
 found_source = None
@@ -18,6 +18,10 @@ candidates = [
 for name in candidates:
     try:
         _tried.append(f"try_import:{name}")
+        # probe the spec first: an absent module is a None result instead of a raised ImportError
+        if importlib.util.find_spec(name) is None:
+            _tried.append(f"no_spec:{name}")
+            continue
         mod = importlib.import_module(name)
         if hasattr(mod, 'Model'):
             Model = getattr(mod, 'Model')
@@ -15,8 +15,12 @@ Usage:
 
 import sys
 import time
+import functools
+import random
 import argparse
+from collections import deque
 from pathlib import Path
+from typing import Optional
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
@@ -32,6 +36,24 @@ from shared.logging import get_logger
 
 logger = get_logger(__name__)
 
+_BANNER = '=' * 70
+_STOPPED_STATES = frozenset({'stopped', 'exited'})
+_STOPPED_FOOTER = (
+    "\n\n⏸️  Monitoring stopped by user (Ctrl+C)\n"
+    "\n💡 Commands:\n"
+    "   Resume:  python monitor.py {instance_id}\n"
+    "   Destroy: python monitor.py {instance_id} --destroy\n"
+    f"\n{_BANNER}\n"
+    "Monitoring finished\n"
+    f"{_BANNER}\n\n"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _hms(second: int) -> str:
+    """HH:MM:SS for an epoch second; the single cache entry turns over once a second."""
+    return time.strftime('%H:%M:%S', time.localtime(second))
+
 
 class InstanceMonitor:
     """Monitor Vast.ai instance and stream logs."""
@@ -39,9 +61,13 @@ class InstanceMonitor:
     def __init__(self, instance_id: int):
         self.instance_id = instance_id
         self.client = VastAIClient()
-        self.last_log_lines = []        # Track previous log lines to show only new ones
+        self.last_log_lines = deque(maxlen=5)  # Last log lines shown; logs are fetched incrementally after them
         self.consecutive_errors = 0     # Track API errors for backoff
         self.max_backoff = 60           # Max backoff delay
+        self.max_idle_interval = 30     # Max poll interval while a running instance is quiet
+        self.backoff_multiplier = 2.0   # Poll interval growth on HTTP 429
+        self._cached_header = None      # Formatted header text, built on first print
+        self._header_info = None        # Instance info the header was built from
 
     def get_info(self):
         """Get instance info."""
@@ -52,147 +78,194 @@ class InstanceMonitor:
             return None
 
     def print_header(self):
-        """Print instance information header."""
-        info = self.get_info()
-        if not info:
-            print(f"❌ Instance #{self.instance_id} not found")
-            return False
-
-        print(f"\n{'='*70}")
-        print(f"📍 Monitoring Instance #{self.instance_id}")
-        print(f"{'='*70}")
-        print(f"GPU:         {info.gpu_name}")
-        print(f"Status:      {info.status}")
-        print(f"State:       {info.actual_status}")
-        print(f"Price:       ${info.price_per_hour:.4f}/hr")
-
-        if info.ssh_host and info.ssh_port:
-            print(f"SSH:         ssh -p {info.ssh_port} root@{info.ssh_host}")
-
-        print(f"{'='*70}\n")
-        return True
-
+        """
+        Print instance information header (built once, re-emitted from cache).
 
-    def monitor(self, tail: int = 1000, interval: int = 5, auto_destroy: bool = False, full_logs: bool = False):
+        Returns:
+            The instance info the header was built from, or None if not found
+        """
+        if self._cached_header is None:
+            info = self.get_info()
+            if not info:
+                print(f"❌ Instance #{self.instance_id} not found")
+                return None
+            self._header_info = info
+
+            ssh = ''
+            if info.ssh_host and info.ssh_port:
+                ssh = f"SSH:         ssh -p {info.ssh_port} root@{info.ssh_host}\n"
+
+            self._cached_header = (
+                f"\n{_BANNER}\n"
+                f"📍 Monitoring Instance #{self.instance_id}\n"
+                f"{_BANNER}\n"
+                f"GPU:         {info.gpu_name}\n"
+                f"Status:      {info.status}\n"
+                f"State:       {info.actual_status}\n"
+                f"Price:       ${info.price_per_hour:.4f}/hr\n"
+                f"{ssh}"
+                f"{_BANNER}\n\n"
+            )
+
+        sys.stdout.write(self._cached_header)
+        sys.stdout.flush()
+        return self._header_info
+
+    @staticmethod
+    def _write(out):
+        """Write a tick's buffered output chunks with a single write + flush."""
+        if out:
+            sys.stdout.write(''.join(out))
+            sys.stdout.flush()
+
+    def monitor(self, tail: int = 1000, interval: int = 5, auto_destroy: bool = False, full_logs: bool = False,
+                info_interval: Optional[int] = None):
         """
         Monitor instance logs in real-time.
 
         Args:
             tail: Number of lines to retrieve
             interval: Refresh interval in seconds
+            info_interval: Instance status refresh interval in seconds (default: max(30, 5 * interval))
             auto_destroy: Automatically destroy instance on completion
             full_logs: Show all logs on first check (not just last 50)
         """
-        if not self.print_header():
+        info = self.print_header()
+        if not info:
             return
 
         print("🔄 Streaming logs... (Ctrl+C to stop monitoring)\n")
 
         check_count = 0
         last_status = None
+        last_actual_status = None
+
+        # Instance status changes slowly: refresh it less often than the logs are tailed
+        if info_interval is None:
+            info_interval = max(30, 5 * interval)
+        # the header's info counts as the first status poll
+        last_info_poll = time.monotonic()
+        # A stopped instance's logs are frozen, but its tail is still fetched once (e.g. when monitoring
+        # starts on an exited instance) before switching to status-only polling
+        stopped_tail_fetched = False
+
+        # Adaptive poll interval: back to `interval` as soon as logs move, stretched while idle
+        self._min_interval = interval
+        self._cur_interval = interval
+        self._max_interval = max(interval, self.max_backoff)
+        self._max_idle = max(interval, min(self.max_idle_interval, self._max_interval))
+        self._backoff = interval    # last API-error retry delay
 
         try:
             while True:
                 check_count += 1
-                current_time = time.strftime('%H:%M:%S')
+                out = []    # this tick's output, written with one write + flush
 
-                # Get instance status
-                info = self.get_info()
+                now = time.monotonic()
+                rate_limited = False
+                try:
+                    if info is not None and info.actual_status in _STOPPED_STATES and stopped_tail_fetched:
+                        # Logs are frozen while stopped: poll status only until the instance runs again
+                        info, logs = self.client.get_instance(self.instance_id), None
+                        last_info_poll = now
+                    elif info is None or now - last_info_poll >= info_interval:
+                        # Get instance status and new logs (both requests in flight at once)
+                        info, logs = self.client.get_instance_with_logs(self.instance_id, tail=tail, since=tuple(self.last_log_lines) or None)
+                        last_info_poll = now
+                    else:
+                        # Logs only; the last instance status is reused until the next refresh
+                        logs = self.client.get_instance_logs(self.instance_id, tail=tail, since=tuple(self.last_log_lines) or None)
+                    stopped_tail_fetched = info.actual_status in _STOPPED_STATES
+                except Exception as e:
+                    logger.error(f"Failed to get instance info: {e}")
+                    rate_limited = self.client.is_rate_limited(e)
+                    info = logs = None
                 if not info:
                     # Don't exit - implement exponential backoff
                     self.consecutive_errors += 1
-                    backoff_delay = min(interval * (2 ** (self.consecutive_errors - 1)), self.max_backoff)
-
-                    print(f"\n⚠️  Failed to get instance info (API error or rate limit)")
-                    print(f"    Retry attempt #{self.consecutive_errors}, waiting {backoff_delay:.0f}s...")
-                    print(f"    (Press Ctrl+C to stop monitoring)")
+                    # decorrelated jitter: each delay is drawn from [interval, 3x the previous one], capped,
+                    # so monitors hitting the same outage don't retry in lockstep
+                    self._backoff = min(self.max_backoff, random.uniform(interval, self._backoff * 3))
+                    backoff_delay = self._backoff
+                    if rate_limited:
+                        # HTTP 429: also stretch the regular poll interval (jittered, then capped)
+                        # so polling stays slower once requests go through again
+                        self._cur_interval = min(self._cur_interval * self.backoff_multiplier * random.uniform(1, 1.25),
+                                                 self._max_interval)
+                        backoff_delay = max(backoff_delay, self._cur_interval)
+
+                    out.append(f"\n⚠️  Failed to get instance info (API error or rate limit)\n"
+                               f"    Retry attempt #{self.consecutive_errors}, waiting {backoff_delay:.0f}s...\n"
+                               f"    (Press Ctrl+C to stop monitoring)\n")
+                    self._write(out)
 
                     time.sleep(backoff_delay)
                     continue
 
                 # Reset error counter on success
                 if self.consecutive_errors > 0:
-                    print(f"\n✅ Connection restored after {self.consecutive_errors} failed attempts")
+                    out.append(f"\n✅ Connection restored after {self.consecutive_errors} failed attempts\n")
                     self.consecutive_errors = 0
+                    self._backoff = interval
 
                 # Show status changes
-                status_str = f"{info.actual_status} / {info.status}"
-                if status_str != last_status:
-                    print(f"\n[{current_time}] 📊 Status: {status_str}")
-                    last_status = status_str
+                status_key = (info.actual_status, info.status)
+                if status_key != last_status:
+                    out.append(f"\n[{_hms(int(time.time()))}] 📊 Status: {info.actual_status} / {info.status}\n")
+                    last_status = status_key
 
                 # Progress indicator
                 if check_count % 2 == 0:
                     # Show different indicator based on instance state
-                    state_indicator = "🔄" if info.actual_status not in ['stopped', 'exited'] else "💤"
-                    print(f"[{current_time}] {state_indicator} Check #{check_count}...", end='\r', flush=True)
+                    state_indicator = "🔄" if info.actual_status not in _STOPPED_STATES else "💤"
+                    out.append(f"[{_hms(int(time.time()))}] {state_indicator} Check #{check_count}...\r")
 
-                # Get logs - SIMPLE: just get them and show new ones
+                # Show logs - only the lines after the last one shown (full tail on first check)
+                shown = None
                 try:
-                    logs = self.client.get_instance_logs(self.instance_id, tail=tail)
-
                     if logs:
-                        lines = logs.split('\n')
-                        current_lines = [l.rstrip() for l in lines if l.strip()]  # Clean lines
-
-                        if not self.last_log_lines:
-                            # First time - show all available logs
-                            print()
-                            for line in current_lines:
-                                print(line)
-                            print()
-                            self.last_log_lines = current_lines
-                        else:
-                            # Find new lines
-                            new_lines = []
-                            if current_lines and self.last_log_lines:
-                                # Find last line from previous check
-                                try:
-                                    last_line = self.last_log_lines[-1]
-                                    idx = current_lines.index(last_line)
-                                    new_lines = current_lines[idx + 1:]
-                                except (ValueError, IndexError):
-                                    # Can't find marker - show last 20 lines
-                                    new_lines = current_lines[-20:]
-                            elif current_lines:
-                                # Have current but no previous - show all
-                                new_lines = current_lines
-
-                            # Print new lines
-                            if new_lines:
-                                for line in new_lines:
-                                    print(line)
-                                print()
+                        # Clean lines: one rstrip per line, blank lines come out empty and are dropped
+                        new_lines = [r for r in (l.rstrip() for l in logs.split('\n')) if r]
+
+                        if new_lines:
+                            # The whole chunk as one string (first time: blank line before all available logs)
+                            lead = '' if self.last_log_lines else '\n'
+                            out.append(lead + '\n'.join(new_lines) + '\n\n')
 
                             # Update state
-                            self.last_log_lines = current_lines
+                            self.last_log_lines.extend(new_lines[-5:])
+                            shown = new_lines[-1]
 
-                    else:
+                    elif not self.last_log_lines:
                         # No logs yet
                         if check_count % 3 == 0:
-                            print(f"  ⏳ Waiting for logs... (check #{check_count})")
+                            out.append(f"  ⏳ Waiting for logs... (check #{check_count})\n")
 
                 except Exception as e:
-                    print(f"[{current_time}] ⚠️  Error fetching logs: {e}")
+                    out.append(f"[{_hms(int(time.time()))}] ⚠️  Error fetching logs: {e}\n")
+
+                if shown is not None:
+                    self._cur_interval = self._min_interval
+                else:
+                    # quiet: stretch the interval; a stopped instance won't log until restarted, so allow more
+                    idle_cap = self._max_interval if info.actual_status in _STOPPED_STATES else self._max_idle
+                    self._cur_interval = min(self._cur_interval * 1.5, idle_cap)
 
                 # Check if stopped - but DON'T exit, just inform
-                if info.actual_status in ['stopped', 'exited']:
+                if info.actual_status in _STOPPED_STATES:
                     # Only show this message once when status changes
-                    if last_status and not any(x in last_status for x in ['stopped', 'exited']):
-                        print(f"\n⚠️  Instance stopped (status: {info.actual_status})")
-                        print(f"    Still monitoring... (logs won't update until instance restarts)")
-                        print(f"    Press Ctrl+C to stop monitoring\n")
+                    if last_actual_status is not None and last_actual_status not in _STOPPED_STATES:
+                        out.append(f"\n⚠️  Instance stopped (status: {info.actual_status})\n"
+                                   f"    Still monitoring... (logs won't update until instance restarts)\n"
+                                   f"    Press Ctrl+C to stop monitoring\n\n")
+                last_actual_status = info.actual_status
 
-                time.sleep(interval)
+                self._write(out)
+                time.sleep(self._cur_interval)
 
         except KeyboardInterrupt:
-            print(f"\n\n⏸️  Monitoring stopped by user (Ctrl+C)")
-            print(f"\n💡 Commands:")
-            print(f"   Resume:  python monitor.py {self.instance_id}")
-            print(f"   Destroy: python monitor.py {self.instance_id} --destroy")
-            print(f"\n{'='*70}")
-            print("Monitoring finished")
-            print(f"{'='*70}\n")
+            sys.stdout.write(_STOPPED_FOOTER.format(instance_id=self.instance_id))
+            sys.stdout.flush()
 
 
 def main():
@@ -221,6 +294,8 @@ Examples:
     parser.add_argument('instance_id', type=int, help='Instance ID to monitor')
     parser.add_argument('--tail', type=int, default=1000, help='Number of log lines (default: 1000)')
     parser.add_argument('--interval', type=int, default=5, help='Refresh interval in seconds (default: 5)')
+    parser.add_argument('--info-interval', type=int, default=None,
+                        help='Instance status refresh interval in seconds (default: max(30, 5 * interval))')
     parser.add_argument('--auto-destroy', action='store_true', help='Auto-destroy on completion')
     parser.add_argument('--destroy', action='store_true', help='Just destroy instance and exit')
     parser.add_argument('--full', action='store_true', help='Show all logs on first check')
@@ -244,7 +319,8 @@ Examples:
         tail=args.tail,
         interval=args.interval,
         auto_destroy=args.auto_destroy,
-        full_logs=args.full
+        full_logs=args.full,
+        info_interval=args.info_interval
     )
 
 
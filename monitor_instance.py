@@ -5,25 +5,103 @@ Usage: python monitor_instance.py <instance_id>
 """
 import sys
 import time
+import functools
 import argparse
 import os
 import json
+import re
+import itertools
+from collections import deque
 from pathlib import Path
 from datetime import datetime, timezone
 
 sys.path.insert(0, '.')
 
 import vast_submit
-import requests
 
 # File to persist last stopped job info so monitor won't react to older runs
 LAST_JOB_FILE = Path('.last_stopped_job')
 
+_BANNER = '=' * 60
+
+# Log lines requested per poll once the monitor has synced with the log
+DELTA_TAIL_LINES = 50
+
+# Fallbacks for reading job metadata when the stop pattern has no named groups
+_JOB_ID_RE = re.compile(r"job_id=([0-9a-f\-]+)", re.IGNORECASE)
+_START_RE = re.compile(r"start=([0-9T:\-+.]+)")
+
+# Completion/failure signals in the recent log window, found in a single pass
+_STATUS_SCANNER = re.compile(
+    r'(Pipeline finished|Pipeline completed successfully)'
+    r'|(Duration:|Upload successful|completed successfully)'
+    r'|(Pipeline failed|FATAL)'
+    r'|(AccessDenied)'
+)
+
+# Stop-pattern syntax that is tied to the pattern's own group numbering or start:
+# numeric / named backreferences and global inline flags such as (?i)
+_UNFOLDABLE_RE = re.compile(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)')
+
+# Lines worth echoing in the success / failure summaries
+_RESULT_LINE_RE = re.compile(r'Output file:|Duration:|Upload successful|https://|Pipeline completed')
+_ERROR_LINE_RE = re.compile(r'ERROR|Failed|Exception|Traceback')
+
+_STOPPED_STATES = frozenset({'stopped', 'exited'})
+
+
+@functools.lru_cache(maxsize=1)
+def _hms(second: int) -> str:
+    """HH:MM:SS for an epoch second; the single cache entry turns over once a second."""
+    return time.strftime('%H:%M:%S', time.localtime(second))
+
+
+def _find_block_end(lines, block):
+    """Index of the last line of the last occurrence of `block` in `lines`, or -1."""
+    n = len(block)
+    last = block[-1]
+    for k in range(len(lines) - 1, n - 2, -1):
+        if lines[k] == last and lines[k - n + 1:k + 1] == block:
+            return k
+    return -1
+
+
+def _last_lines_text(text, n):
+    """The last `n` lines of `text` as one slice of it (no split + join)."""
+    pos = len(text)
+    for _ in range(n):
+        pos = text.rfind('\n', 0, pos)
+        if pos < 0:
+            return text
+    return text[pos + 1:]
+
+
+def _write(text):
+    """Write a block of output with a single write + flush."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _last_n(lines, n):
+    """The last `n` entries of a deque (or list) as a new list."""
+    return list(itertools.islice(lines, max(0, len(lines) - n), None))
+
+
+def _download_log_snapshot(inst_id, tail):
+    """Request a snapshot of the last `tail` log lines and download it (None if not available yet)."""
+    res = vast_submit.api_put(f'/instances/request_logs/{inst_id}/', {'tail': str(tail)})
+    if 'temp_download_url' not in res:
+        return None
+    time.sleep(1.5)  # Short pause to allow logs to be prepared
+    r = vast_submit.SESSION.get(res['temp_download_url'], timeout=15)
+    r.encoding = 'utf-8'  # logs are UTF-8; skips requests' charset detection when .text is read
+    return r
+
 
 def _load_last_job():
     try:
         if LAST_JOB_FILE.exists():
-            data = json.loads(LAST_JOB_FILE.read_text(encoding='utf-8'))
+            data = json.loads(LAST_JOB_FILE.read_bytes())
             jid = data.get('job_id')
             start = data.get('start')
             if jid and start:
@@ -38,8 +116,11 @@ def _load_last_job():
 
 
 def _save_last_job(job_id: str, start_iso: str):
+    # Write to a temp file and rename over the old one, so a crash mid-write can't leave it truncated
+    tmp = LAST_JOB_FILE.with_name(LAST_JOB_FILE.name + '.tmp')
     try:
-        LAST_JOB_FILE.write_text(json.dumps({'job_id': job_id, 'start': start_iso}, ensure_ascii=False), encoding='utf-8')
+        tmp.write_text(json.dumps({'job_id': job_id, 'start': start_iso}, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, LAST_JOB_FILE)
     except Exception:
         pass
 
@@ -82,7 +163,8 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
     print("=== Streaming logs (Ctrl+C to exit) ===")
     print("Refreshing every 5 seconds...\n")
 
-    last_log_lines = []
+    last_log_lines = deque(maxlen=tail_lines)  # rolling tail of the log, bounded by tail_lines
+    last_log_content = None  # raw bytes of the last downloaded snapshot
     check_count = 0
     last_status = None
     stop_sent = False  # ensure stop request sent only once
@@ -92,37 +174,53 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
     # Additional flag: allow stopping on simple remote_runner success messages (default: disabled)
     auto_remote_env = os.environ.get('AUTO_STOP_ON_REMOTE_SUCCESS', '0')
     AUTO_STOP_ON_REMOTE = str(auto_remote_env).lower() not in ('0', 'false', 'no', '')
+    # Adaptive polling: stretch the interval (up to 30s) while no new lines arrive (default: disabled)
+    adaptive_env = os.environ.get('MONITOR_ADAPTIVE', '0')
+    ADAPTIVE_INTERVAL = str(adaptive_env).lower() not in ('0', 'false', 'no', '')
+    idle_polls = 0
 
     # Default pattern includes named captures for job id and start timestamp (ISO format)
     DEFAULT_STOP_PATTERNS = [
-        r"===\s*VASTAI_PIPELINE_COMPLETED_SUCCESSFULLY\s*===\s*job_id=(?P<job>[0-9a-f\-]+)\s*start=(?P<start>\S+)"
+        r"===\s*VASTAI_PIPELINE_COMPLETED_SUCCESSFULLY\s*===\s*job_id=(?P<job>[0-9a-fA-F\-]+)\s*start=(?P<start>\S+)"
     ]
+    # The container prints the default marker verbatim, so it is matched case-sensitively
+    # (lets re skip ahead on its literal prefix); user patterns keep case-insensitive matching
+    stop_flags = 0
 
     # Allow overriding patterns via env: AUTO_STOP_PATTERNS with '||' as separator
     raw_patterns = os.environ.get('AUTO_STOP_PATTERNS')
     if raw_patterns:
         try:
             patterns = [p for p in raw_patterns.split('||') if p.strip()]
+            stop_flags = re.IGNORECASE
         except Exception:
             patterns = DEFAULT_STOP_PATTERNS
     else:
         patterns = DEFAULT_STOP_PATTERNS
 
-    # Compile regexes (case-insensitive)
-    import re
+    # Compile regexes
     try:
-        STOP_REGEXS = [re.compile(p, re.IGNORECASE) for p in patterns]
+        STOP_REGEXS = [re.compile(p, stop_flags) for p in patterns]
     except Exception:
         # fallback to simple substring checks if regex compile fails
         STOP_REGEXS = []
 
+    # Several stop patterns: fold them into one alternation so each poll scans the new text once.
+    # Patterns that can't share a regex (e.g. both define (?P<job>...), or use backreferences or
+    # global inline flags, whose meaning changes once wrapped) keep being tried one by one.
+    if len(STOP_REGEXS) > 1 and not any(_UNFOLDABLE_RE.search(rx.pattern) for rx in STOP_REGEXS):
+        try:
+            STOP_REGEXS = [re.compile('|'.join(f'(?:{rx.pattern})' for rx in STOP_REGEXS), stop_flags)]
+        except re.error:
+            pass
+
     # Load last seen/stopped job to avoid reacting to older runs
     last_job = _load_last_job()
 
     while True:
         try:
             check_count += 1
-            current_time = time.strftime('%H:%M:%S')
+            got_new_lines = False
 
             # Fetch status
             info = vast_submit.get_instance(inst_id)
@@ -135,73 +233,81 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
             current_status = inst.get('actual_status', 'unknown')
 
             # Print status only if it changed
-            status_str = f"{current_state} / {current_status}"
-            if status_str != last_status:
-                print(f"\n[{current_time}] 📊 Status: {status_str}")
-                last_status = status_str
+            status_key = (current_state, current_status)
+            if status_key != last_status:
+                print(f"\n[{_hms(int(time.time()))}] 📊 Status: {current_state} / {current_status}")
+                last_status = status_key
 
             # Every 2 checks show a small 'alive' indicator
             if check_count % 2 == 0:
-                print(f"[{current_time}] 🔄 Check #{check_count}...", end='\r', flush=True)
+                print(f"[{_hms(int(time.time()))}] 🔄 Check #{check_count}...", end='\r', flush=True)
 
             # Request logs
             try:
-                res = vast_submit.api_put(f'/instances/request_logs/{inst_id}/', {'tail': str(tail_lines)})
-
-                if 'temp_download_url' in res:
-                    time.sleep(1.5)  # Short pause to allow logs to be prepared
-
-                    r = requests.get(res['temp_download_url'], timeout=15)
-                    if r.status_code == 200:
-                        current_lines = r.text.strip().split('\n')
+                # Only the first poll needs the full tail; later ones ask for a short window and widen
+                # to the full tail only if the block of last lines already seen isn't in it
+                # (the same block match that resyncs on the previous lines below)
+                # A changed snapshot is decoded and split once; the same lines serve the block match and the diff.
+                anchor = _last_n(last_log_lines, 5)
+                window = min(tail_lines, DELTA_TAIL_LINES) if last_log_lines else tail_lines
+                for size in (window, tail_lines):
+                    r = _download_log_snapshot(inst_id, size)
+                    current_lines = None
+                    if r is not None and r.status_code == 200 and r.content != last_log_content:
+                        raw_text = r.text.strip()
+                        current_lines = raw_text.split('\n')
+                        if size < tail_lines and _find_block_end(current_lines, anchor) < 0:
+                            continue
+                    break
+
+                if r is not None:
+                    if r.status_code == 200 and current_lines is None:
+                        # Same snapshot as the last poll: nothing new to diff, print or scan.
+                        # (Every request_logs call signs a new URL, so there is no ETag/304 to rely on.)
+                        pass
+                    elif r.status_code == 200:
+                        last_log_content = r.content
 
                         # Find new lines (if we had previous logs). On the first request new_lines will be empty,
                         # to avoid reacting to old markers from previous runs.
                         new_lines = []
+                        marker_idx = -1
                         if last_log_lines:
                             # More robust algorithm: find the last unique line from previous logs
                             # and treat everything after it as new lines.
-                            last_non_empty = [l for l in last_log_lines[-20:] if l.strip()]
-                            # take up to last 5 non-empty as signature
-                            last_non_empty = last_non_empty[-5:] if last_non_empty else []
-
-                            if last_non_empty:
-                                last_marker = last_non_empty[-1]
-                                try:
-                                    marker_idx = len(current_lines) - 1 - current_lines[::-1].index(last_marker)
-                                    new_lines = current_lines[marker_idx + 1:]
-                                except ValueError:
-                                    # If not found, show the last 30 lines as "new"
-                                    new_lines = current_lines[-30:]
+                            # The previous snapshot's last lines are matched as a block, walking back
+                            # from the end without copying: a repeated single line can't resync wrongly
+                            marker_idx = _find_block_end(current_lines, anchor)
+                            if marker_idx >= 0:
+                                new_lines = current_lines[marker_idx + 1:]
                             else:
+                                # If not found, show the last 30 lines as "new"
                                 new_lines = current_lines[-30:]
 
-                        # Print new lines (if present)
+                        # Print new lines (if present), the whole block with one write
                         if new_lines:
-                            shown_lines = 0
-                            for line in new_lines:
-                                if not line.strip():
-                                    continue
-                                print(line)
-                                shown_lines += 1
-                            if shown_lines > 0:
-                                print()  # Empty line after the log block
+                            text = '\n'.join(line for line in new_lines if line.strip())
+                            if text:
+                                _write(text + '\n\n')  # Empty line after the log block
+                                got_new_lines = True
                         else:
                             # First request - show last 50 lines for more context
                             if not last_log_lines:
-                                print("--- Recent logs (50 lines) ---")
-                                for line in current_lines[-50:]:
-                                    if line.strip():
-                                        print(line)
-                                print("---\n")
-
-                        # Now update last_log_lines
-                        last_log_lines = current_lines
+                                text = ''.join(line + '\n' for line in current_lines[-50:] if line.strip())
+                                _write(f"--- Recent logs (50 lines) ---\n{text}---\n\n")
+
+                        # Now update last_log_lines: append what follows the resync point, or start over
+                        # from this snapshot if the previous lines could not be found in it
+                        if marker_idx < 0:
+                            last_log_lines.clear()
+                            last_log_lines.extend(current_lines)
+                        else:
+                            last_log_lines.extend(new_lines)
 
                         # Detect container-side success marker ONLY in newly appended lines
                         try:
                             if AUTO_STOP_ENABLED and (not stop_sent) and new_lines:
-                                recent_new_text = '\n'.join(new_lines)
+                                recent_new_text = _last_lines_text(raw_text, len(new_lines))
                                 matched = False
                                 used_pattern = None
                                 match_obj = None
@@ -241,13 +347,11 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
                                     # Fallback: try simple parse from recent_new_text
                                     if not job_id:
                                         # look for 'job_id=' token
-                                        import re as _re
-                                        m2 = _re.search(r"job_id=([0-9a-f\-]+)", recent_new_text, _re.IGNORECASE)
+                                        m2 = _JOB_ID_RE.search(recent_new_text)
                                         if m2:
                                             job_id = m2.group(1)
                                     if not job_start_iso:
-                                        import re as _re
-                                        m3 = _re.search(r"start=([0-9T:\-+.]+)", recent_new_text)
+                                        m3 = _START_RE.search(recent_new_text)
                                         if m3:
                                             job_start_iso = m3.group(1)
 
@@ -261,11 +365,13 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
                                     if not job_id and not job_start_iso and AUTO_STOP_ON_REMOTE:
                                         # synthesize a job id and timestamp for persistence
                                         try:
-                                            synth_id = f"remote_success_{datetime.now(timezone.utc).isoformat()}"
-                                            synth_start = datetime.now(timezone.utc).isoformat()
+                                            synth_dt = datetime.now(timezone.utc)
+                                            synth_start = synth_dt.isoformat()
+                                            synth_id = f"remote_success_{synth_start}"
                                         except Exception:
                                             synth_id = 'remote_success'
-                                            synth_start = datetime.now().isoformat()
+                                            synth_dt = datetime.now()
+                                            synth_start = synth_dt.isoformat()
                                         try:
                                             print(f"\nInstance will be stopped due to remote_runner success (instance {inst_id})")
                                         except Exception:
@@ -278,7 +384,7 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
                                         stop_sent = True
                                         try:
                                             _save_last_job(synth_id, synth_start)
-                                            last_job = {'job_id': synth_id, 'start': datetime.fromisoformat(synth_start)}
+                                            last_job = {'job_id': synth_id, 'start': synth_dt}
                                         except Exception:
                                             pass
                                         continue
@@ -319,7 +425,8 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
                                     if job_id and job_start_iso:
                                         try:
                                             _save_last_job(job_id, job_start_iso)
-                                            last_job = {'job_id': job_id, 'start': datetime.fromisoformat(job_start_iso)}
+                                            # reuse the timestamp parsed above (None if it wasn't valid ISO)
+                                            last_job = {'job_id': job_id, 'start': job_start_dt}
                                         except Exception:
                                             pass
                         except Exception:
@@ -327,81 +434,83 @@ def monitor_instance(inst_id, tail_lines=200, interval=5):
                             pass
 
                         # Check for completion - ONLY in the last 100 lines!
-                        recent_log = '\n'.join(current_lines[-100:])
-
-                        # Check that pipeline is active (has recent messages)
-                        is_active = any(marker in recent_log for marker in [
-                            'Starting pipeline', 'Processing', 'Interpolation', 'Upscaling',
-                            'pairs/sec', 'GPU:', 'frames'
-                        ])
+                        # (taken from the accumulated history: later polls download a shorter window)
+                        recent_lines = _last_n(last_log_lines, 100)
+                        recent_log = '\n'.join(recent_lines)
+
+                        finished = has_completion = failed = False
+                        access_denied = 0
+                        for m in _STATUS_SCANNER.finditer(recent_log):
+                            if m.group(1):
+                                finished = True
+                                # the marker itself also counts as a completion line
+                                has_completion = has_completion or m.group(1).endswith('completed successfully')
+                            elif m.group(2):
+                                has_completion = True
+                            elif m.group(3):
+                                failed = True
+                            else:
+                                access_denied += 1
 
-                        if ('Pipeline finished' in recent_log or 'Pipeline completed successfully' in recent_log):
+                        if finished:
                             # Additional check - there should be a line with Duration or Upload successful
-                            has_completion = any(marker in recent_log for marker in [
-                                'Duration:', 'Upload successful', 'completed successfully'
-                            ])
-
                             if has_completion:
-                                print("\n" + "="*60)
-                                print("🎉 SUCCESS! Pipeline finished!")
-                                print("="*60)
-
                                 # Show final results
-                                for line in current_lines[-50:]:
-                                    if any(kw in line for kw in ['Output file:', 'Duration:', 'Upload successful', 'https://', 'Pipeline completed']):
-                                        print(line)
-
-                                print(f"\n✅ Processing completed successfully!")
-                                print(f"   Instance: {inst_id}")
-                                print(f"   GPU: {gpu}")
-                                print(f"\n📌 Commands:")
-                                print(f"   Download logs: python scripts/show_logs.py {inst_id} > logs_{inst_id}.txt")
-                                print(f"   Stop:          python scripts/manage_instance.py {inst_id} --stop")
+                                results = ''.join(line + '\n' for line in recent_lines[-50:]
+                                                  if _RESULT_LINE_RE.search(line))
+                                _write(f"\n{_BANNER}\n"
+                                       f"🎉 SUCCESS! Pipeline finished!\n"
+                                       f"{_BANNER}\n"
+                                       f"{results}"
+                                       f"\n✅ Processing completed successfully!\n"
+                                       f"   Instance: {inst_id}\n"
+                                       f"   GPU: {gpu}\n"
+                                       f"\n📌 Commands:\n"
+                                       f"   Download logs: python scripts/show_logs.py {inst_id} > logs_{inst_id}.txt\n"
+                                       f"   Stop:          python scripts/manage_instance.py {inst_id} --stop\n")
                                 break
 
                         # Check for fatal errors - also only in the last lines
-                        if 'Pipeline failed' in recent_log or 'FATAL' in recent_log:
-                            print("\n" + "="*60)
-                            print("❌ ERROR! Pipeline failed")
-                            print("="*60)
-
+                        if failed:
                             # Show recent error lines
-                            for line in current_lines[-30:]:
-                                if any(kw in line for kw in ['ERROR', 'Failed', 'Exception', 'Traceback']):
-                                    print(line)
-
-                            print(f"\n❌ Processing finished with error")
-                            print(f"\n📌 Commands:")
-                            print(f"   Full logs:  python scripts/show_logs.py {inst_id}")
-                            print(f"   Stop:       python scripts/manage_instance.py {inst_id} --stop")
+                            errors = ''.join(line + '\n' for line in recent_lines[-30:]
+                                             if _ERROR_LINE_RE.search(line))
+                            _write(f"\n{_BANNER}\n"
+                                   f"❌ ERROR! Pipeline failed\n"
+                                   f"{_BANNER}\n"
+                                   f"{errors}"
+                                   f"\n❌ Processing finished with error\n"
+                                   f"\n📌 Commands:\n"
+                                   f"   Full logs:  python scripts/show_logs.py {inst_id}\n"
+                                   f"   Stop:       python scripts/manage_instance.py {inst_id} --stop\n")
                             break
 
                         # Check for AccessDenied in recent lines
-                        if 'AccessDenied' in recent_log:
-                            # Count occurrences in the last 100 lines
-                            count = recent_log.count('AccessDenied')
-                            if count > 2:  # If appears more than 2 times in the last logs - an issue
-                                print(f"\n⚠️  WARNING: AccessDenied appears {count} times in recent logs!")
-                                print("   Possible issue with B2 permissions or the curl command")
+                        if access_denied > 2:  # If appears more than 2 times in the last logs - an issue
+                            print(f"\n⚠️  WARNING: AccessDenied appears {access_denied} times in recent logs!")
+                            print("   Possible issue with B2 permissions or the curl command")
 
                 else:
-                    print(f"[{current_time}] ⚠️  Logs not available yet (check #{check_count})")
+                    print(f"[{_hms(int(time.time()))}] ⚠️  Logs not available yet (check #{check_count})")
 
             except Exception as e:
-                print(f"[{current_time}] ⚠️  Error fetching logs: {e}")
+                print(f"[{_hms(int(time.time()))}] ⚠️  Error fetching logs: {e}")
 
             # If the instance is stopped
-            if current_state in ['stopped', 'exited']:
-                print(f"\n⚠️  Instance stopped (state: {current_state})")
-                print("\nRecent logs:")
-                if last_log_lines:
-                    for line in last_log_lines[-20:]:
-                        if line.strip():
-                            print(line)
+            if current_state in _STOPPED_STATES:
+                recent = ''.join(line + '\n' for line in _last_n(last_log_lines, 20) if line.strip())
+                _write(f"\n⚠️  Instance stopped (state: {current_state})\n"
+                       f"\nRecent logs:\n"
+                       f"{recent}")
                 break
 
             # Wait before the next check
-            time.sleep(interval)
+            if ADAPTIVE_INTERVAL:
+                # Double the wait for each quiet poll (up to 8x, capped at 30s); back to interval on new lines
+                idle_polls = 0 if got_new_lines else idle_polls + 1
+                time.sleep(min(interval * (1 << min(idle_polls, 3)), max(interval, 30)))
+            else:
+                time.sleep(interval)
 
         except KeyboardInterrupt:
             print("\n\n⏸️  Monitoring interrupted by user")
@@ -6,7 +6,9 @@ Infrastructure layer for Vast.ai integration.
 
 import os
 import time
-from typing import List, Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import logging
 
 from domain.vastai import (
@@ -19,7 +21,9 @@ from domain.exceptions import VideoProcessingError
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     from requests.exceptions import RequestException
+    from urllib3.util.retry import Retry
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
@@ -32,6 +36,9 @@ class VastAIClient:
     Uses requests library to interact with Vast.ai public API.
     """
 
+    # Lines requested per incremental log poll before widening to the full tail
+    LOG_DELTA_TAIL = 50
+
     def __init__(
         self,
         api_key: Optional[str] = None,
@@ -56,11 +63,42 @@ class VastAIClient:
         self.api_base = api_base or os.getenv('VAST_API_BASE', 'https://api.vast.ai/v0')
         self.logger = logger or logging.getLogger(__name__)
 
-        # Setup session
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.session = self._new_session()
+
+        # get_instance_with_logs runs the log request on one long-lived worker thread. requests.Session
+        # is not thread-safe, so that thread gets its own session (see _session)
+        self._local = threading.local()
+        self._log_pool = None
+
+    @staticmethod
+    def _new_session() -> 'requests.Session':
+        """Create an API session: keep-alive connections are reused across polls, idempotent GETs
+        are retried with backoff on rate limits and transient server errors."""
+        session = requests.Session()
+        session.headers.update({
             'Accept': 'application/json',
         })
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=['GET'],
+            )
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _session(self) -> 'requests.Session':
+        """The session for the current thread (the log worker's own, otherwise self.session)."""
+        return getattr(self._local, 'session', None) or self.session
+
+    def _init_log_worker(self):
+        """Give the log worker thread its own session."""
+        self._local.session = self._new_session()
 
     def _request(
         self,
@@ -90,7 +128,7 @@ class VastAIClient:
         kwargs['params'] = params
 
         try:
-            response = self.session.request(method, url, **kwargs)
+            response = self._session().request(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
         except RequestException as e:
@@ -303,44 +341,152 @@ class VastAIClient:
             self.logger.error(f"Get instance failed: {e.__class__.__name__}: {e}")
             raise VideoProcessingError(f"Failed to get instance: {e}") from e
 
-    def get_instance_logs(self, instance_id: int, tail: int = 100) -> str:
+    def get_instance_logs(
+        self,
+        instance_id: int,
+        tail: int = 100,
+        since: Optional[Union[str, Sequence[str]]] = None
+    ) -> str:
         """
         Get instance container logs via Vast.ai API.
 
         Uses PUT /instances/request_logs/{id}/ endpoint which returns a temp_download_url.
 
+        The endpoint only serves a tail snapshot (no offsets), so incremental
+        polling is done by anchoring on the last lines the caller has seen: a short
+        tail is requested first and widened only if the anchor has scrolled out.
+
         Args:
             instance_id: Instance ID
             tail: Number of lines to retrieve
+            since: Last non-blank log line(s) already seen by the caller, oldest
+                first. If given, only the text after their last occurrence as whole
+                consecutive lines is returned (the whole tail if it is not found).
+                Passing a few lines instead of one keeps a repeated line from
+                matching an earlier copy of itself.
 
         Returns:
-            Log output as string
+            Log output as string ("" if the logs could not be fetched)
+
+        Raises:
+            Exception: Only if the request was rate limited (see is_rate_limited),
+                so callers can back off instead of polling an empty log
         """
         try:
-            # Step 1: Request logs (returns temp download URL)
-            response = self._request(
-                'PUT',
-                f'instances/request_logs/{instance_id}/',
-                data={'tail': str(tail)}
-            )
+            if since is None:
+                return self._download_logs(instance_id, tail)
+
+            block = [since] if isinstance(since, str) else list(since)
+            window = min(tail, self.LOG_DELTA_TAIL)
+            while True:
+                logs = self._download_logs(instance_id, window)
+                new = self._lines_after(logs, block)
+                if new is not None:
+                    return new
+                if not logs or window >= tail:
+                    return logs
+                window = min(tail, window * 4)
 
-            # Step 2: Get download URL
-            temp_url = response.get('temp_download_url')
-            if not temp_url:
-                self.logger.debug(f"No temp_download_url in response: {response}")
-                return ""
+        except Exception as e:
+            if self.is_rate_limited(e):
+                raise
+            self.logger.debug(f"Failed to get logs for instance #{instance_id}: {e}")
+            return ""
 
-            # Step 3: Download logs from temp URL
-            import requests
-            log_response = requests.get(temp_url, timeout=10)
-            log_response.raise_for_status()
+    @staticmethod
+    def is_rate_limited(error: BaseException) -> bool:
+        """Check whether a failed request was rejected with HTTP 429 (directly or after retries)."""
+        while error is not None:
+            response = getattr(error, 'response', None)
+            if getattr(response, 'status_code', None) == 429 or 'too many 429' in str(error):
+                return True
+            error = error.__cause__
+        return False
+
+    @staticmethod
+    def _lines_after(logs: str, block: List[str]) -> Optional[str]:
+        """
+        Text after the last occurrence of `block` as consecutive non-blank lines of `logs`.
 
-            return log_response.text
+        Lines are compared whole (trailing whitespace ignored), never as substrings.
 
-        except Exception as e:
-            self.logger.debug(f"Failed to get logs for instance #{instance_id}: {e}")
+        Returns:
+            The remaining text, or None if `block` does not occur
+        """
+        block = [line.rstrip() for line in block if line.strip()]
+        if not block:
+            return None
+
+        lines = logs.split('\n')
+        # non-blank lines only, so blank lines between them don't break the match
+        positions = [i for i, line in enumerate(lines) if line.strip()]
+        n = len(block)
+        for k in range(len(positions) - 1, n - 2, -1):
+            if (lines[positions[k]].rstrip() == block[-1]
+                    and [lines[i].rstrip() for i in positions[k - n + 1:k + 1]] == block):
+                return '\n'.join(lines[positions[k] + 1:])
+        return None
+
+    def get_instance_with_logs(
+        self,
+        instance_id: int,
+        tail: int = 100,
+        since: Optional[Union[str, Sequence[str]]] = None
+    ) -> Tuple[VastInstance, str]:
+        """
+        Get instance details and container logs in one round-trip time.
+
+        The API has no combined endpoint, so the log request runs on a long-lived
+        worker thread (with its own session) while the instance details are fetched
+        on the calling one. If the details fail, the error is raised and the logs of
+        this call are dropped; the caller's anchor hasn't moved, so the next call
+        returns the same lines again.
+
+        Args:
+            instance_id: Instance ID
+            tail: Number of lines to retrieve
+            since: Last log line(s) already seen (see get_instance_logs)
+
+        Returns:
+            (instance, logs) tuple
+
+        Raises:
+            VideoProcessingError: If the instance details cannot be fetched
+        """
+        if self._log_pool is None:
+            self._log_pool = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix='vastai-logs',
+                initializer=self._init_log_worker
+            )
+        logs = self._log_pool.submit(self.get_instance_logs, instance_id, tail, since)
+        instance = self.get_instance(instance_id)
+        return instance, logs.result()
+
+    def _download_logs(self, instance_id: int, tail: int) -> str:
+        """Request a log snapshot of the last `tail` lines and download it."""
+        # Step 1: Request logs (returns temp download URL)
+        response = self._request(
+            'PUT',
+            f'instances/request_logs/{instance_id}/',
+            data={'tail': str(tail)}
+        )
+
+        # Step 2: Get download URL
+        temp_url = response.get('temp_download_url')
+        if not temp_url:
+            self.logger.debug(f"No temp_download_url in response: {response}")
             return ""
 
+        # Step 3: Download logs from temp URL
+        log_response = self._session().get(temp_url, timeout=10)
+        log_response.raise_for_status()
+
+        # The log object is served without a charset; without this, .text runs
+        # charset detection over the whole payload before decoding it
+        log_response.encoding = 'utf-8'
+        return log_response.text
+
     def destroy_instance(self, instance_id: int) -> bool:
         """Destroy instance."""
         self.logger.info(f"Destroying instance #{instance_id}")
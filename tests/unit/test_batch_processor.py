@@ -0,0 +1,43 @@
+"""
+Unit tests for batch processor log monitoring.
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from batch_processor import BatchProcessor
+from infrastructure.vastai.client import VastAIClient
+
+
+RESULT_URL = "https://f000.backblazeb2.com/file/noxfvr-videos/output/clip.mp4"
+
+
+@pytest.fixture
+def processor():
+    """BatchProcessor with a real client whose snapshot download is mocked."""
+    processor = BatchProcessor.__new__(BatchProcessor)
+    processor.vast_client = VastAIClient(api_key="test_key")
+    return processor
+
+
+class TestMonitorProcessing:
+    """Test _monitor_processing against incremental log snapshots."""
+
+    def test_repeated_anchor_before_success_marker(self, processor):
+        """A repeated last line doesn't hide the success marker that follows it."""
+        snapshots = [
+            "start\nOK\n",
+            f"start\nOK\nUploaded {RESULT_URL}\nOK\nVASTAI_PIPELINE_COMPLETED_SUCCESSFULLY\nOK\n",
+        ]
+
+        def download(instance_id, tail):
+            return snapshots.pop(0) if len(snapshots) > 1 else snapshots[0]
+
+        with patch.object(processor.vast_client, '_download_logs', side_effect=download), \
+                patch('time.sleep'):
+            assert processor._monitor_processing(1, timeout=5) == RESULT_URL
@@ -225,6 +225,109 @@ class TestVastAIClientBasic:
         assert 'Accept' in client.session.headers
 
 
+class TestVastAIClientLogs:
+    """Test incremental log fetching (snapshot download is mocked)."""
+
+    def test_full_tail_without_since(self):
+        """Without an anchor the whole tail is returned."""
+        client = VastAIClient(api_key="test_key")
+
+        with patch.object(client, '_download_logs', return_value="a\nb\n") as download:
+            assert client.get_instance_logs(1, tail=500) == "a\nb\n"
+
+        download.assert_called_once_with(1, 500)
+
+    def test_since_returns_only_new_lines(self):
+        """Lines after the anchor are returned from a short tail."""
+        client = VastAIClient(api_key="test_key")
+
+        with patch.object(client, '_download_logs', return_value="a\nb\nc\nd\n") as download:
+            assert client.get_instance_logs(1, tail=500, since="b") == "c\nd\n"
+
+        download.assert_called_once_with(1, VastAIClient.LOG_DELTA_TAIL)
+
+    def test_since_widens_until_anchor_found(self):
+        """A short tail that lost the anchor is widened up to the full tail."""
+        client = VastAIClient(api_key="test_key")
+        snapshots = ["x\ny\n", "b\nx\ny\n"]
+
+        with patch.object(client, '_download_logs', side_effect=snapshots) as download:
+            assert client.get_instance_logs(1, tail=500, since="b") == "x\ny\n"
+
+        assert download.call_count == 2
+
+    def test_since_block_skips_repeated_anchor(self):
+        """A repeated anchor line resyncs on the block of lines seen before it."""
+        client = VastAIClient(api_key="test_key")
+        snapshot = "pair 1 done\nOK\nnew line with OK inside\nOK\n"
+
+        with patch.object(client, '_download_logs', return_value=snapshot):
+            assert client.get_instance_logs(1, tail=500, since=["pair 1 done", "OK"]) == \
+                "new line with OK inside\nOK\n"
+
+    def test_since_matches_whole_lines(self):
+        """An anchor that is a prefix or substring of later lines is not matched inside them."""
+        client = VastAIClient(api_key="test_key")
+
+        with patch.object(client, '_download_logs', return_value="step 10\nstep 1\nstep 100\n"):
+            assert client.get_instance_logs(1, tail=500, since="step 1") == "step 100\n"
+
+        with patch.object(client, '_download_logs', return_value="a\nOK\nnot OK yet\n"):
+            assert client.get_instance_logs(1, tail=500, since="OK") == "not OK yet\n"
+
+    def test_since_not_found_returns_whole_snapshot(self):
+        """If the anchor is gone even from the full tail, the whole snapshot is returned."""
+        client = VastAIClient(api_key="test_key")
+
+        with patch.object(client, '_download_logs', return_value="x\ny\n") as download:
+            assert client.get_instance_logs(1, tail=500, since=["a", "b"]) == "x\ny\n"
+
+        assert download.call_args_list[-1][0] == (1, 500)
+
+    def test_rate_limit_is_raised(self):
+        """A 429 from the log request is raised so the caller can back off; other errors give ""."""
+        client = VastAIClient(api_key="test_key")
+        cause = Exception("429 Client Error: Too Many Requests")
+        cause.response = Mock(status_code=429)
+        error = VideoProcessingError("Vast.ai API request failed")
+        error.__cause__ = cause
+
+        with patch.object(client, '_download_logs', side_effect=error):
+            with pytest.raises(VideoProcessingError):
+                client.get_instance_logs(1, tail=500)
+
+        with patch.object(client, '_download_logs', side_effect=VideoProcessingError("boom")):
+            assert client.get_instance_logs(1, tail=500) == ""
+
+    def test_instance_with_logs(self):
+        """Instance details and logs are returned together."""
+        client = VastAIClient(api_key="test_key")
+        instance = Mock()
+
+        with patch.object(client, 'get_instance', return_value=instance), \
+                patch.object(client, 'get_instance_logs', return_value="c\n") as get_logs:
+            assert client.get_instance_with_logs(1, tail=500, since="b") == (instance, "c\n")
+
+        get_logs.assert_called_once_with(1, 500, "b")
+
+    def test_instance_with_logs_uses_own_session_for_logs(self):
+        """The concurrent log request doesn't share the calling thread's session."""
+        client = VastAIClient(api_key="test_key")
+        sessions = []
+
+        def get_logs(instance_id, tail, since):
+            sessions.append(client._session())
+            return "c\n"
+
+        with patch.object(client, 'get_instance', return_value=Mock()), \
+                patch.object(client, 'get_instance_logs', side_effect=get_logs):
+            client.get_instance_with_logs(1, tail=500)
+            client.get_instance_with_logs(1, tail=500)
+
+        assert sessions[0] is not client.session
+        assert sessions[0] is sessions[1]
+
+
 # Note: Full API integration tests would require real API access or complex mocking
 # The domain models (VastOffer, VastInstance, VastInstanceConfig) are tested above
 # For now, basic client initialization is tested
@@ -86,6 +86,10 @@ if not API_KEY:
 
 HEADERS = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
 
+# Shared session: keep-alive connections are reused by api_get/api_post/api_put, so pollers
+# (e.g. monitor_instance.py) don't pay a TCP+TLS handshake on every request
+SESSION = requests.Session()
+
 # Load host blacklist from config.yaml (optional). This allows setting e.g.:
 # vast:
 #   host_blacklist: [155386]
@@ -130,7 +134,7 @@ def api_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any
         attempted.append(base)
         url = f"{base.rstrip('/')}{path}"
         try:
-            r = requests.get(url, headers=HEADERS, params=params, timeout=30)
+            r = SESSION.get(url, headers=HEADERS, params=params, timeout=30)
             r.raise_for_status()
             # If we succeeded on a fallback base, update global API_BASE for subsequent calls
             if base != API_BASE:
@@ -173,7 +177,7 @@ def api_post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         attempted.append(base)
         url = f"{base.rstrip('/')}{path}"
         try:
-            r = requests.post(url, headers=HEADERS, json=payload, timeout=60)
+            r = SESSION.post(url, headers=HEADERS, json=payload, timeout=60)
             r.raise_for_status()
             if base != API_BASE:
                 try:
@@ -207,7 +211,7 @@ def api_put(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         attempted.append(base)
         url = f"{base.rstrip('/')}{path}"
         try:
-            r = requests.put(url, headers=HEADERS, json=payload, timeout=60)
+            r = SESSION.put(url, headers=HEADERS, json=payload, timeout=60)
             r.raise_for_status()
             if base != API_BASE:
                 try: